@@ -1,5 +1,19 @@
 from textdisplay import TripleTriadColors
+from evaluation import EVALUATIONS, SCORE_WEIGHT, ScoreEvaluation
+from events import ThinkingEvent
+from packed import PackedState, popcount
+from solver import EndgameSolver
+from symmetry import BoardSymmetry
+from transposition import LRUTranspositionTable, TranspositionTable, REPLACE_DEPTH, EXACT, LOWER_BOUND, UPPER_BOUND
+import constants
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+import math
+import multiprocessing
+import random
+import threading
+import time
+import utils
 
 
 class Agent:
@@ -7,24 +21,34 @@ class Agent:
 
     Attributes:
         index (int): The index of the player
+        events (EventBus): Receives the agent's events once it joins a Game, otherwise None
 
     Methods:
         initialize: Prepares agent for a new game
         get_action: Throws NotImplemented error; should be implemented by subclass
+        start_pondering: Called when another player starts their turn; agents that think ahead override it
+        stop_pondering: Called when the other player's turn ends
+        close: Called when the game ends; agents holding threads or processes release them
         increment_score: Increments player score by 1
         decrement_score: Decrements player score by 1
         place_card_in_hand: Places a given card in the player's hand
         set_hand: Deals a full hand of cards to the player
         play_card: Removes a card from the player's hand
+        take_card_from_hand: Removes and returns the card at a given hand index
+        return_card_to_hand: Puts a card back at a given hand index
     """
 
     __metaclass__ = ABCMeta
 
+    # Game states copy their agents for every successor, so agents carry no instance dict
+    __slots__ = ('_hand', '_index', '_name', '_score', 'events')
+
     def __init__(self, index):
         self._hand = []
         self._index = index
         self._name = "Player {}".format(index + 1)
         self._score = 0
+        self.events = None
 
     def __deepcopy__(self, memo_dict={}):
         copy_agent = Agent(self._index)
@@ -42,6 +66,15 @@ class Agent:
     def get_action(self, game_state):
         raise NotImplemented("Method needs to be implemented in sub class")
 
+    def start_pondering(self, game_state):
+        pass
+
+    def stop_pondering(self):
+        pass
+
+    def close(self):
+        pass
+
     @property
     def name(self):
         return self._name
@@ -80,6 +113,12 @@ class Agent:
         # Card not in player's hand
         return None
 
+    def take_card_from_hand(self, card_index):
+        return self._hand.pop(card_index)
+
+    def return_card_to_hand(self, card_index, card):
+        self._hand.insert(card_index, card)
+
     def __eq__(self, other):
         return self.score == other.score
 
@@ -100,91 +139,805 @@ class Agent:
 
 
 class FirstAvailableAgent(Agent):
+    __slots__ = ()
+
     def __init__(self, index):
         super().__init__(index)
 
     """For Testing: Uses first available card in first available space"""
     def get_action(self, game_state):
-        legal_cards, legal_grid_spaces = game_state.get_legal_agent_actions(self)
-        return 0, list(legal_grid_spaces.values())[0].get_coordinates()
+        return next(game_state.iter_legal_actions(self))
 
 
-class MinMaxAgent(Agent):
+class RandomAgent(Agent):
+    __slots__ = ()
+
     def __init__(self, index):
         super().__init__(index)
 
+    """Plays a random card in a random available space"""
+    def get_action(self, game_state):
+        free_spaces = list(game_state.get_game_board().iter_free_spaces())
+        return utils.random_choice(range(len(self._hand))), utils.random_choice(free_spaces)
+
+
+class MinMaxAgent(Agent):
+    """Searches the packed game state with negamax and alpha-beta pruning
+
+    Moves are ordered by the transposition table's best move, killer moves per ply,
+    immediate flip gain and a history table keyed by (card id, cell), so the best
+    replies are searched first and the rest are cut off. Positions reached again
+    through a different move order are answered from the transposition table.
+    Copies of a card in hand lead to the same positions, so only the first is searched.
+    Once fewer than endgame_threshold turns remain, the EndgameSolver plays exactly.
+
+    By default the search deepens one ply at a time until the move time is up and
+    plays the best move of the last completed iteration. Each iteration searches
+    the previous principal variation first. Without a move time it searches to depth.
+
+    With workers, the most promising root move is searched first to set alpha and
+    the remaining root moves are farmed out to a process pool. Workers receive the
+    serialized PackedState and share the best root value found so far, so moves
+    started later search with a tighter window.
+
+    With ponder, the agent searches the likely replies in a background thread while
+    the other player is thinking, most flips first, keeping the results in its
+    transposition table across turns. If the position it is then given was searched
+    to the full depth, the stored best move is played without searching again; with
+    a move time, deepening picks up after the pondered depth instead.
+    Positions left to the EndgameSolver are not pondered.
+
+    With a persistent cache, the transposition table and the EndgameSolver's table are
+    LRUTranspositionTables that are kept for the agent's lifetime, across its turns and
+    sudden death rounds. Positions are keyed by Zobrist key, which does not depend on the
+    order of cards in hand. Later turns mostly search subtrees of earlier searches and are
+    answered from the cache; its stats count the entries reused from earlier searches.
+
+    With symmetry, positions that are rotations or reflections of one another share
+    transposition table entries through BoardSymmetry's canonical key, and moves that
+    a symmetry of the position maps onto each other are searched once. Canonical keys
+    cost more than Zobrist keys, so they are only used when a symmetry of the board and
+    its elements also maps the cards in play onto themselves.
+
+    Positions the search stops short of the end of the game are scored by the evaluation.
+    The default 'score' evaluation counts only the score difference; 'positional' also
+    weighs the cards in hand and how exposed each card on the board is to being flipped.
+    Finished games are always scored by the score difference alone.
+
+    Attributes:
+        index (int): The index of the player
+        depth (int): The maximum number of plies to search, or None to search to the end of the game
+        transposition_table (TranspositionTable): The table of search results, or None to search without one
+        endgame_threshold (int): The solver takes over below this many turns remaining; 0 never uses it
+        move_time_ms (int): The wall clock budget per move in milliseconds, constants.DEFAULT_MOVE_TIME_MS
+            by default, or None to search to depth, which must then be given
+        workers (int): The number of processes searching root moves in parallel, or None to search serially
+        ponder (bool): Whether to search the replies to the other player's turn while they think
+        persistent_cache (bool): Whether search results are kept across turns, holding at most
+            transposition_table_size entries and evicting the least recently used
+        symmetry (bool): Whether rotations and reflections of a position are searched as one
+        evaluation (ScoreEvaluation): Scores positions where the search stops; a name from EVALUATIONS
+            or an object with prepare and evaluate methods may be given
+
+    Methods:
+        get_action: Returns the best (card_index, coordinates) found by the search
+        get_search_stats: Returns a dict of node, cutoff, transposition and timing counts for the last search
+        get_timing_stats: Returns a dict summarizing the time taken by every move so far
+        start_pondering: Starts searching the replies to a position with the other player to move
+        stop_pondering: Stops the pondering search and waits for it to finish
+        close: Stops pondering and shuts down the worker processes of a parallel search
+    """
+
+    def __init__(self, index, depth=None, transposition_table_size=1 << 18, replacement=REPLACE_DEPTH,
+                 endgame_threshold=8, move_time_ms=constants.DEFAULT_MOVE_TIME_MS, workers=None, ponder=False,
+                 persistent_cache=False, symmetry=False, evaluation='score'):
+        super().__init__(index)
+        # Set before any argument check can raise, so close finds them on a half built agent
+        self._executor = None
+        self._shared_alpha = None
+        self._ponder_thread = None
+        self._ponder_stop = threading.Event()
+
+        if depth is None and move_time_ms is None:
+            # Searching every move to the end of the game takes minutes on 3x3 boards and never ends on larger ones
+            raise ValueError('A search without a move time needs a depth')
+        if (ponder or persistent_cache) and not transposition_table_size:
+            raise ValueError('Pondering and the persistent cache need a transposition table, which is disabled')
+        if evaluation in EVALUATIONS:
+            evaluation = EVALUATIONS[evaluation]()
+        elif not hasattr(evaluation, 'evaluate'):
+            raise ValueError('Unknown evaluation: ' + str(evaluation))
+        self.evaluation = evaluation
+        # The last ply can be scored from the best flip gain alone only when the score is all that counts
+        self._use_flip_gain = type(evaluation) is ScoreEvaluation
+        self.depth = depth
+        self.move_time_ms = move_time_ms
+        self.workers = workers
+        self._transposition_table_size = transposition_table_size
+        self.persistent_cache = persistent_cache
+        self.transposition_table = None
+        if persistent_cache:
+            self.transposition_table = LRUTranspositionTable(transposition_table_size)
+        elif transposition_table_size:
+            self.transposition_table = TranspositionTable(transposition_table_size, replacement)
+        self.endgame_threshold = endgame_threshold
+        self.endgame_solver = EndgameSolver(persistent=persistent_cache)
+        self.endgame_result = None
+
+        self.nodes_searched = 0
+        self.cutoffs = 0
+        self.completed_depth = 0
+        self.move_times_ms = []
+        self._killer_moves = []
+        self._history = {}
+        self._principal_variation = ()
+        self._previous_principal_variation = ()
+        self._principal_variation_below = ()
+        self._deadline = None
+        # Counts the moves searched, so parallel search workers know when to clear their tables
+        self._search_count = 0
+
+        self.symmetry = symmetry
+        self.symmetric_actions_pruned = 0
+        self.duplicate_actions_pruned = 0
+        self._board_symmetry = None
+        self._use_canonical_keys = False
+
+        self.ponder = ponder
+        self.ponder_hits = 0
+        self.ponder_hit = False
+
+    def __del__(self):
+        # Game closes its agents when it ends; this only covers agents used without a Game
+        self.close()
+
     def __deepcopy__(self, memo_dict={}):
-        new_agent = MinMaxAgent(self._index)
+        # Game states copy their agents for every successor, so the copy shares the search settings,
+        # tables and solver rather than building its own, and takes only its own hand and score
+        new_agent = MinMaxAgent.__new__(MinMaxAgent)
+        new_agent.__dict__.update(self.__dict__)
         new_agent._index = self._index
         new_agent._hand = list(self._hand)
-        new_agent._name = self.name
-        new_agent._score = self.score
+        new_agent._name = self._name
+        new_agent._score = self._score
+        new_agent.events = None
+
+        # The worker processes and pondering thread stay with the original
+        new_agent._executor = None
+        new_agent._shared_alpha = None
+        new_agent._ponder_thread = None
+        new_agent._ponder_stop = threading.Event()
 
         return new_agent
 
+    def get_search_stats(self):
+        stats = {
+            'nodes': self.nodes_searched,
+            'cutoffs': self.cutoffs,
+            'cut_rate': self.cutoffs / self.nodes_searched if self.nodes_searched else 0.0,
+            'completed_depth': self.completed_depth,
+            'time_ms': self.move_times_ms[-1] if self.move_times_ms else 0.0,
+            'ponder_hit': self.ponder_hit,
+            'symmetric_actions_pruned': self.symmetric_actions_pruned,
+            'duplicate_actions_pruned': self.duplicate_actions_pruned,
+        }
+        if self.transposition_table is not None:
+            stats['transposition'] = self.transposition_table.get_stats()
+        if self.endgame_result is not None:
+            stats['endgame'] = dict(self.endgame_solver.get_stats(), result=self.endgame_result)
+        return stats
+
+    def get_timing_stats(self):
+        if not self.move_times_ms:
+            return {'moves': 0, 'mean_ms': 0.0, 'max_ms': 0.0, 'ponder_hits': 0}
+        return {
+            'moves': len(self.move_times_ms),
+            'mean_ms': sum(self.move_times_ms) / len(self.move_times_ms),
+            'max_ms': max(self.move_times_ms),
+            'ponder_hits': self.ponder_hits,
+        }
+
+    def start_pondering(self, game_state):
+        if not self.ponder or self._ponder_thread is not None:
+            return
+        # The thread works on its own packed copy, so the game state may change under it
+        packed_state = PackedState.from_game_state(game_state)
+        self._set_board_symmetry(packed_state)
+        self.evaluation.prepare(packed_state)
+        self._ponder_stop.clear()
+        # Searches check the deadline every few nodes; stop_pondering moves it into the past
+        self._deadline = float('inf')
+        self._ponder_thread = threading.Thread(target=self._ponder, args=(packed_state,), daemon=True)
+        self._ponder_thread.start()
+
+    def stop_pondering(self):
+        if self._ponder_thread is None:
+            return
+        self._ponder_stop.set()
+        self._deadline = float('-inf')
+        self._ponder_thread.join()
+        self._ponder_thread = None
+        self._deadline = None
+
+    def _ponder(self, packed_state):
+        other_player_index = 1 - self._index
+        self._killer_moves = [None] * (packed_state.cell_count + 1)
+        try:
+            for card_index, cell, flipped in self._get_ordered_actions(packed_state, other_player_index, 0, None):
+                if self._ponder_stop.is_set():
+                    break
+                token = packed_state.apply_move(other_player_index, card_index, cell, flipped)
+                max_depth = packed_state.get_count_turns_remaining()
+                if self.depth is not None:
+                    max_depth = min(max_depth, self.depth)
+                if packed_state.get_count_turns_remaining() >= self.endgame_threshold and max_depth:
+                    # Deepen one ply at a time, so the reply keeps a result if the other player moves first
+                    self._previous_principal_variation = ()
+                    for depth in range(1, max_depth + 1):
+                        self._search_root_serially(packed_state, depth)
+                        self._previous_principal_variation = self._principal_variation
+                packed_state.undo_move(token)
+        except _SearchTimeout:
+            pass
+
+    def close(self):
+        self.stop_pondering()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
     def get_action(self, game_state):
-        legal_cards, legal_grid_spaces = game_state.get_legal_agent_actions(self)
-        max_action = 0, list(legal_grid_spaces.values())[0].get_coordinates()
-        value = float('-inf')
-        depth = 9 % game_state.get_count_turns_remaining()
-
-        print("Thinking...")
-
-        # Go through each available card
-        for card_index in range(len(legal_cards)):
-            # Go through each available space on the board
-            for coordinates, grid_space in legal_grid_spaces.items():
-                # Generate possible game state successor
-                result = self.dive_down(
-                    game_state.generate_successor(self._index, (card_index, coordinates)),
-                    depth
-                )
-                if value < result:
-                    value = result
-                    max_action = card_index, coordinates
-
-        return max_action
-
-    def dive_down(self, game_state, depth):
-        game_state.increment_player_turn()
-        current_agent = game_state.get_current_player()
-
-        agents = game_state.get_agents()
-        other_player_index = (self._index + 1) % len(agents)
-        current_result = 100 * (agents[self._index].score - agents[other_player_index].score)
+        if self.events is not None and self.events.wants(ThinkingEvent):
+            self.events.publish(ThinkingEvent(self))
+        start_time = time.perf_counter()
+
+        self.endgame_result = None
+        if game_state.get_count_turns_remaining() < self.endgame_threshold:
+            # Few enough cells are free to solve the rest of the game exactly
+            self.endgame_result, action = self.endgame_solver.solve(game_state, self._index)
+            self.move_times_ms.append((time.perf_counter() - start_time) * 1000)
+            return action
+
+        search_state = PackedState.from_game_state(game_state)
+        depth = search_state.get_count_turns_remaining()
+        if self.depth is not None:
+            depth = min(depth, self.depth)
+
+        self.nodes_searched = 0
+        self.cutoffs = 0
+        self.completed_depth = 0
+        self.symmetric_actions_pruned = 0
+        self.duplicate_actions_pruned = 0
+        self.ponder_hit = False
+        self._set_board_symmetry(search_state)
+        self.evaluation.prepare(search_state)
+        pondered_entry = None
+        if self.ponder:
+            entry = self.transposition_table.probe(search_state.get_key(self._index))
+            if entry is not None and entry.bound == EXACT and entry.best_move is not None:
+                pondered_entry = entry
+            if pondered_entry is not None and pondered_entry.depth >= depth:
+                # A reply searched to the full depth while the other player thought is played at once
+                card_id, cell = pondered_entry.best_move
+                self.ponder_hit = True
+                self.ponder_hits += 1
+                self.completed_depth = pondered_entry.depth
+                self.move_times_ms.append((time.perf_counter() - start_time) * 1000)
+                return search_state.hands[self._index].index(card_id), search_state.get_coordinates(cell)
+
+        self._killer_moves = [None] * (depth + 1)
+        self._history = {}
+        self._previous_principal_variation = ()
+        self._search_count += 1
+        if self.persistent_cache:
+            self.transposition_table.new_search()
+        elif self.transposition_table is not None and not self.ponder:
+            self.transposition_table.clear()
+
+        if self.move_time_ms is None:
+            card_index, cell = self._search_root(search_state, depth)
+            self.completed_depth = depth
+        else:
+            card_index, cell = self._search_iteratively(search_state, depth, start_time, pondered_entry)
+
+        self.move_times_ms.append((time.perf_counter() - start_time) * 1000)
+        return card_index, search_state.get_coordinates(cell)
+
+    def _set_board_symmetry(self, packed_state):
+        self._board_symmetry = None
+        self._use_canonical_keys = False
+        if self.symmetry:
+            self._board_symmetry = BoardSymmetry(packed_state, within_game=True)
+            self._use_canonical_keys = self._board_symmetry.is_symmetric()
+
+    def _search_iteratively(self, packed_state, max_depth, start_time, pondered_entry=None):
+        if pondered_entry is None:
+            # The first iteration always completes so there is a move to play
+            best_action = self._search_root(packed_state, 1)
+            self.completed_depth = 1
+        else:
+            # Pick up from the depth the position was pondered to
+            card_id, cell = pondered_entry.best_move
+            best_action = packed_state.hands[self._index].index(card_id), cell
+            self.completed_depth = pondered_entry.depth
+            self._principal_variation = (pondered_entry.best_move,)
+
+        self._deadline = start_time + self.move_time_ms / 1000
+        try:
+            for depth in range(self.completed_depth + 1, max_depth + 1):
+                self._previous_principal_variation = self._principal_variation
+                best_action = self._search_root(packed_state, depth)
+                self.completed_depth = depth
+        except _SearchTimeout:
+            # The unfinished iteration is thrown away along with its half made moves
+            pass
+        finally:
+            self._deadline = None
+
+        return best_action
+
+    def _search_root(self, packed_state, depth):
+        if self.workers:
+            return self._search_root_in_parallel(packed_state, depth)
+        return self._search_root_serially(packed_state, depth)
+
+    def _search_root_serially(self, packed_state, depth):
+        alpha, beta = float('-inf'), float('inf')
+        other_player_index = 1 - self._index
+        hand = packed_state.hands[self._index]
+
+        best_action = None
+        for card_index, cell, flipped in self._get_ordered_actions(packed_state, self._index, 0, None):
+            card_id = hand[card_index]
+            token = packed_state.apply_move(self._index, card_index, cell, flipped)
+            value = -self._negamax(packed_state, other_player_index, depth - 1, -beta, -alpha, 1)
+            packed_state.undo_move(token)
+            if best_action is None or value > alpha:
+                alpha = value
+                best_action = card_index, cell
+                self._principal_variation = ((card_id, cell),) + self._principal_variation_below
+
+        if self.transposition_table is not None:
+            # The root is searched with a full window, so its value is exact
+            card_index, cell = best_action
+            self.transposition_table.store(packed_state.get_key(self._index), alpha, depth, EXACT,
+                                           (packed_state.hands[self._index][card_index], cell))
+        return best_action
+
+    def _search_root_in_parallel(self, packed_state, depth):
+        if self._executor is None:
+            self._shared_alpha = multiprocessing.Value('d', float('-inf'))
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 initializer=_initialize_search_worker,
+                                                 initargs=(self._shared_alpha, self._transposition_table_size,
+                                                           self.evaluation))
+
+        ordered_actions = self._get_ordered_actions(packed_state, self._index, 0, None)
+        hand = packed_state.hands[self._index]
+        other_player_index = 1 - self._index
+
+        # The eldest brother is searched here with a full window to set alpha for the rest
+        card_index, cell, flipped = ordered_actions[0]
+        token = packed_state.apply_move(self._index, card_index, cell, flipped)
+        alpha = -self._negamax(packed_state, other_player_index, depth - 1, float('-inf'), float('inf'), 1)
+        packed_state.undo_move(token)
+        best_action = card_index, cell
+        self._principal_variation = ((hand[card_index], cell),) + self._principal_variation_below
+        self._shared_alpha.value = alpha
+
+        worker_deadline = None
+        if self._deadline is not None:
+            worker_deadline = time.time() + self._deadline - time.perf_counter()
+
+        serialized_state = packed_state.serialize()
+        futures = [
+            self._executor.submit(_search_root_action, serialized_state, self._index, card_index, cell, depth,
+                                  self._previous_principal_variation, worker_deadline, self._search_count)
+            for card_index, cell, _ in ordered_actions[1:]
+        ]
+
+        timed_out = False
+        for future in futures:
+            result = future.result()
+            if result is None:
+                timed_out = True
+                continue
+            value, worker_alpha, card_index, cell, principal_variation, nodes_searched, cutoffs = result
+            self.nodes_searched += nodes_searched
+            self.cutoffs += cutoffs
+            # Values at or below the alpha a worker started from are only upper bounds. That alpha is the
+            # exact value of another root move, so the move is no better than one already found.
+            if value > worker_alpha and value > alpha:
+                alpha = value
+                best_action = card_index, cell
+                self._principal_variation = principal_variation
+
+        if timed_out:
+            raise _SearchTimeout()
+        return best_action
+
+    def _negamax(self, packed_state, agent_index, depth, alpha, beta, ply):
+        self.nodes_searched += 1
+        if self._deadline is not None and not self.nodes_searched & 63 and time.perf_counter() > self._deadline:
+            raise _SearchTimeout()
+
+        # The principal variation below this node, built up as better moves are found
+        self._principal_variation_below = ()
+
+        if packed_state.is_terminal():
+            scores = packed_state.scores
+            return SCORE_WEIGHT * (scores[agent_index] - scores[1 - agent_index])
         if depth == 0:
-            return current_result
-
-        legal_cards, legal_grid_spaces = game_state.get_legal_agent_actions(current_agent)
-
-        if current_agent.index == self._index:
-            # Maximize own interests
-            value = float('-inf')
-            for card_index in range(len(legal_cards)):
-                # Go through each available space on the board
-                for coordinates, grid_space in legal_grid_spaces.items():
-                    result = self.dive_down(
-                        game_state.generate_successor(self._index, (card_index, coordinates)),
-                        depth - 1
-                    )
-                    value = max(value, result + current_result)
-            return value
+            return self.evaluation.evaluate(packed_state, agent_index)
+        if depth == 1 and self._use_flip_gain:
+            # The last ply only needs the best immediate flip gain, no move has to be made
+            return self.evaluation.evaluate(packed_state, agent_index) + \
+                SCORE_WEIGHT * 2 * self._get_best_flip_gain(packed_state, agent_index)
+
+        # Use or narrow the window with a stored result for this position
+        transposition_table = self.transposition_table
+        key = best_move = None
+        if transposition_table is not None:
+            if self._use_canonical_keys:
+                key = self._board_symmetry.get_canonical_key(packed_state, agent_index)
+            else:
+                key = packed_state.get_key(agent_index)
+            entry = transposition_table.probe(key)
+            if entry is not None:
+                best_move = entry.best_move
+                if entry.depth >= depth:
+                    if entry.bound == EXACT:
+                        return entry.value
+                    if entry.bound == LOWER_BOUND:
+                        alpha = max(alpha, entry.value)
+                    else:
+                        beta = min(beta, entry.value)
+                    if alpha >= beta:
+                        return entry.value
+        original_alpha = alpha
+
+        hand = packed_state.hands[agent_index]
+        value = float('-inf')
+        principal_variation = ()
+        for card_index, cell, flipped in self._get_ordered_actions(packed_state, agent_index, ply, best_move):
+            card_id = hand[card_index]
+            token = packed_state.apply_move(agent_index, card_index, cell, flipped)
+            result = -self._negamax(packed_state, 1 - agent_index, depth - 1, -beta, -alpha, ply + 1)
+            packed_state.undo_move(token)
+
+            if result > value:
+                value = result
+                best_move = card_id, cell
+            if value > alpha:
+                alpha = value
+                principal_variation = ((card_id, cell),) + self._principal_variation_below
+            if alpha >= beta:
+                # Remember the refutation for sibling nodes and later searches
+                self.cutoffs += 1
+                self._killer_moves[ply] = (card_id, cell)
+                self._history[(card_id, cell)] = self._history.get((card_id, cell), 0) + depth * depth
+                break
+
+        if transposition_table is not None:
+            if value <= original_alpha:
+                bound = UPPER_BOUND
+            elif value >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            transposition_table.store(key, value, depth, bound, best_move)
+
+        self._principal_variation_below = principal_variation
+        return value
+
+    @staticmethod
+    def _get_best_flip_gain(packed_state, agent_index):
+        best_flip_gain = 0
+        free_cells = packed_state.get_free_cells()
+        for card_id in set(packed_state.hands[agent_index]):
+            for cell in free_cells:
+                flip_gain = popcount(packed_state.placement_flips(cell, card_id, agent_index))
+                if flip_gain > best_flip_gain:
+                    best_flip_gain = flip_gain
+        return best_flip_gain
+
+    def _get_ordered_actions(self, packed_state, agent_index, ply, best_move):
+        hand = packed_state.hands[agent_index]
+        free_cells = packed_state.get_free_cells()
+        killer_move = self._killer_moves[ply]
+        history = self._history
+        principal_move = None
+        if ply < len(self._previous_principal_variation):
+            principal_move = self._previous_principal_variation[ply]
+
+        ordered_actions = []
+        searched_card_ids = set()
+        for card_index, card_id in enumerate(hand):
+            if card_id in searched_card_ids:
+                # Another copy of the card leads to the same positions
+                self.duplicate_actions_pruned += len(free_cells)
+                continue
+            searched_card_ids.add(card_id)
+            for cell in free_cells:
+                flipped = packed_state.placement_flips(cell, card_id, agent_index)
+                if (card_id, cell) == principal_move:
+                    # The previous iteration's principal variation is tried first,
+                    # then the stored best move and the killer move
+                    priority = float('inf')
+                elif (card_id, cell) == best_move:
+                    priority = 1 << 61
+                elif (card_id, cell) == killer_move:
+                    priority = 1 << 60
+                else:
+                    priority = popcount(flipped) * 1000000 + history.get((card_id, cell), 0)
+                ordered_actions.append((priority, card_index, cell, flipped))
+
+        ordered_actions.sort(key=lambda action: action[0], reverse=True)
+        ordered_actions = [(card_index, cell, flipped) for _, card_index, cell, flipped in ordered_actions]
+        if self._use_canonical_keys:
+            # Cells a symmetry of the position maps onto each other lead to equivalent positions
+            ordered_actions, pruned = self._board_symmetry.get_distinct_actions(packed_state, agent_index,
+                                                                                ordered_actions)
+            self.symmetric_actions_pruned += pruned
+        return ordered_actions
+
+
+class _SearchTimeout(Exception):
+    """Raised inside the search when the move deadline has passed"""
+    pass
+
+
+# Per process state of parallel search workers
+_worker_agent = None
+_worker_shared_alpha = None
+_worker_search_count = None
+
+
+def _initialize_search_worker(shared_alpha, transposition_table_size, evaluation):
+    global _worker_agent, _worker_shared_alpha
+    _worker_shared_alpha = shared_alpha
+    _worker_agent = MinMaxAgent(0, transposition_table_size=transposition_table_size, endgame_threshold=0,
+                                evaluation=evaluation)
+
+
+def _search_root_action(serialized_state, agent_index, card_index, cell, depth, principal_variation, deadline,
+                        search_count):
+    """ Searches one root move in a worker process. Returns the move's value, the alpha it was searched with,
+        the action, its principal variation and node counts, or None if the deadline passed.
+    """
+    global _worker_search_count
+    agent = _worker_agent
+    if search_count != _worker_search_count:
+        # Like the serial search, results are kept across the iterations of one move but not across moves
+        if agent.transposition_table is not None:
+            agent.transposition_table.clear()
+        _worker_search_count = search_count
+    packed_state = PackedState.deserialize(serialized_state)
+    card_id = packed_state.hands[agent_index][card_index]
+
+    agent.nodes_searched = 0
+    agent.cutoffs = 0
+    agent._killer_moves = [None] * (depth + 1)
+    agent._history = {}
+    agent._previous_principal_variation = principal_variation
+    agent.evaluation.prepare(packed_state)
+    agent._deadline = None
+    if deadline is not None:
+        agent._deadline = time.perf_counter() + deadline - time.time()
+
+    # Moves searched later start from the best value found by any worker so far
+    alpha = _worker_shared_alpha.value
+    token = packed_state.apply_move(agent_index, card_index, cell)
+    try:
+        value = -agent._negamax(packed_state, 1 - agent_index, depth - 1, float('-inf'), -alpha, 1)
+    except _SearchTimeout:
+        return None
+    packed_state.undo_move(token)
+
+    with _worker_shared_alpha.get_lock():
+        if value > _worker_shared_alpha.value:
+            _worker_shared_alpha.value = value
+
+    return (value, alpha, card_index, cell, ((card_id, cell),) + agent._principal_variation_below,
+            agent.nodes_searched, agent.cutoffs)
+
+
+class _MonteCarloNode:
+    """A position in the Monte Carlo search tree, with the results of the rollouts through it"""
+
+    __slots__ = ('key', 'player', 'children', 'untried_actions', 'visits', 'wins')
+
+    def __init__(self, key, player):
+        self.key = key
+        self.player = player
+        # Children are keyed by (card id, cell), so copies of a card in hand share one child
+        self.children = {}
+        self.untried_actions = None
+        self.visits = 0
+        # Wins are counted for the player who moved into this position; draws count half
+        self.wins = 0.0
+
+
+class MonteCarloAgent(Agent):
+    """Searches the packed game state with Monte Carlo tree search, selecting moves by UCT
+
+    Each rollout descends the tree by the UCT formula, expands one untried move and
+    plays the rest of the game out with random moves, made and unmade in place on
+    the packed state. The result is backed up through the tree and the most visited
+    root move is played, so the agent gets stronger the more rollouts it can afford.
+
+    The tree is kept between turns of a game. When the position at the next turn is
+    found below the previous root, that subtree becomes the new root and the
+    rollouts already spent on it count toward the new search.
+
+    Attributes:
+        index (int): The index of the player
+        iterations (int): The number of rollouts per move, at least 1, or None to roll out until the move time is up
+        move_time_ms (int): The wall clock budget per move in milliseconds, or None to stop after iterations
+        exploration (float): The UCT exploration constant
+
+    Methods:
+        get_action: Returns the most visited (card_index, coordinates) after the rollouts
+        get_search_stats: Returns a dict of rollout, tree reuse and timing counts for the last search
+        get_timing_stats: Returns a dict summarizing the time and rollout rate of every move so far
+    """
+
+    # The rollouts per move when neither iterations nor a move time is given
+    DEFAULT_ITERATIONS = 2000
+
+    def __init__(self, index, iterations=None, move_time_ms=None, exploration=math.sqrt(2)):
+        super().__init__(index)
+        if iterations is not None and iterations < 1:
+            raise ValueError('The search needs at least one rollout per move, not ' + str(iterations))
+        if iterations is None and move_time_ms is None:
+            iterations = self.DEFAULT_ITERATIONS
+        self.iterations = iterations
+        self.move_time_ms = move_time_ms
+        self.exploration = exploration
+
+        self._root = None
+        self.rollouts = 0
+        self.reused_rollouts = 0
+        self.search_seconds = 0.0
+        self.total_rollouts = 0
+        self.total_search_seconds = 0.0
+        self.move_times_ms = []
+
+    def __deepcopy__(self, memo_dict={}):
+        new_agent = MonteCarloAgent(self._index, self.iterations, self.move_time_ms, self.exploration)
+        new_agent._hand = list(self._hand)
+        new_agent._name = self._name
+        new_agent._score = self._score
+
+        return new_agent
+
+    def get_search_stats(self):
+        return {
+            'rollouts': self.rollouts,
+            'rollouts_per_sec': self.rollouts / self.search_seconds if self.search_seconds else 0.0,
+            'reused_rollouts': self.reused_rollouts,
+            'root_visits': self._root.visits if self._root is not None else 0,
+            'time_ms': self.move_times_ms[-1] if self.move_times_ms else 0.0,
+        }
+
+    def get_timing_stats(self):
+        if not self.move_times_ms:
+            return {'moves': 0, 'mean_ms': 0.0, 'max_ms': 0.0, 'rollouts_per_sec': 0.0}
+        return {
+            'moves': len(self.move_times_ms),
+            'mean_ms': sum(self.move_times_ms) / len(self.move_times_ms),
+            'max_ms': max(self.move_times_ms),
+            'rollouts_per_sec': self.total_rollouts / self.total_search_seconds if self.total_search_seconds else 0.0,
+        }
+
+    def get_action(self, game_state):
+        if self.events is not None and self.events.wants(ThinkingEvent):
+            self.events.publish(ThinkingEvent(self))
+        start_time = time.perf_counter()
+
+        search_state = PackedState.from_game_state(game_state)
+        key = search_state.get_key(self._index)
+        root = self._find_subtree(key)
+        if root is None:
+            root = _MonteCarloNode(key, self._index)
+        self._root = root
+        self.reused_rollouts = root.visits
+
+        deadline = None
+        if self.move_time_ms is not None:
+            deadline = start_time + self.move_time_ms / 1000
+
+        # The first rollout always runs so the root has a move to play
+        self._rollout(search_state, root)
+        self.rollouts = 1
+        while self.iterations is None or self.rollouts < self.iterations:
+            if deadline is not None and not self.rollouts & 15 and time.perf_counter() > deadline:
+                break
+            self._rollout(search_state, root)
+            self.rollouts += 1
+
+        self.search_seconds = time.perf_counter() - start_time
+        self.total_rollouts += self.rollouts
+        self.total_search_seconds += self.search_seconds
+
+        (card_id, cell), _ = max(root.children.items(), key=lambda item: item[1].visits)
+        self.move_times_ms.append(self.search_seconds * 1000)
+        return search_state.hands[self._index].index(card_id), search_state.get_coordinates(cell)
+
+    def _find_subtree(self, key):
+        """Returns the node with a given key among the previous root, its children and grandchildren, or None"""
+        nodes = [self._root] if self._root is not None else []
+        # The previous root, after this agent's move and after the reply
+        for _ in range(3):
+            for node in nodes:
+                if node.key == key:
+                    return node
+            nodes = [child for node in nodes for child in node.children.values()]
+        return None
+
+    def _rollout(self, packed_state, root):
+        exploration = self.exploration
+        node = root
+        path = [root]
+        tokens = []
+
+        # Selection: follow UCT down through positions whose moves have all been tried
+        while node.children and not node.untried_actions:
+            log_visits = math.log(node.visits)
+            best_value = best_action = best_child = None
+            for action, child in node.children.items():
+                value = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+                if best_value is None or value > best_value:
+                    best_value, best_action, best_child = value, action, child
+            tokens.append(self._apply_action(packed_state, node.player, best_action))
+            node = best_child
+            path.append(node)
+
+        # Expansion: add one untried move to the tree
+        if node.untried_actions is None:
+            hand = packed_state.hands[node.player]
+            free_cells = packed_state.get_free_cells()
+            node.untried_actions = [(card_id, cell) for card_id in dict.fromkeys(hand) for cell in free_cells]
+        if node.untried_actions:
+            action = node.untried_actions.pop(random.randrange(len(node.untried_actions)))
+            tokens.append(self._apply_action(packed_state, node.player, action))
+            child = _MonteCarloNode(packed_state.get_key(1 - node.player), 1 - node.player)
+            node.children[action] = child
+            node = child
+            path.append(node)
+
+        # Simulation: play random moves to the end of the game
+        player = node.player
+        while not packed_state.is_terminal():
+            hand = packed_state.hands[player]
+            tokens.append(packed_state.apply_move(player, random.randrange(len(hand)),
+                                                  random.choice(packed_state.get_free_cells())))
+            player = 1 - player
+
+        scores = packed_state.scores
+        if scores[0] > scores[1]:
+            first_player_result = 1.0
+        elif scores[0] < scores[1]:
+            first_player_result = 0.0
         else:
-            # Minimize opponent interests
-            # TODO Can only check cards if open rule is in play
-            value = float('-inf')
-            for card_index in range(len(legal_cards)):
-                # Go through each available space on the board
-                for coordinates, grid_space in legal_grid_spaces.items():
-                    result = self.dive_down(
-                        game_state.generate_successor(self._index, (card_index, coordinates)),
-                        depth - 1
-                    )
-                    value = max(value, result + current_result)
-            return value
+            first_player_result = 0.5
+        for token in reversed(tokens):
+            packed_state.undo_move(token)
+
+        # Backpropagation: each node scores the result for the player who moved into it
+        for node in path:
+            node.visits += 1
+            node.wins += first_player_result if node.player else 1.0 - first_player_result
+
+    @staticmethod
+    def _apply_action(packed_state, player, action):
+        card_id, cell = action
+        return packed_state.apply_move(player, packed_state.hands[player].index(card_id), cell)
 
 
 class KeyBoardAgent(Agent):
+    __slots__ = ('self_color',)
+
     def __init__(self, index):
         super().__init__(index)
         self.self_color = TripleTriadColors.AGENT_COLORS[index]
@@ -199,12 +952,11 @@ class KeyBoardAgent(Agent):
         return new_agent
 
     def get_action(self, game_state):
-        # Get legal cards/spaces
-        legal_cards, legal_grid_spaces = game_state.get_legal_agent_actions(self)
+        game_board = game_state.get_game_board()
 
         # Get player move
-        card_index, coordinates = -1, None
-        while not (0 <= card_index < len(legal_cards) and coordinates in legal_grid_spaces):
+        card_index, coordinates = -1, (-1, -1)
+        while not (0 <= card_index < len(self._hand) and game_board.is_free(coordinates)):
             player_input = input("{}'s turn: ".format(
                         self.self_color + self._name + TripleTriadColors.COLOR_RESET))
             result = player_input.split(' ')
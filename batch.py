@@ -0,0 +1,331 @@
+from cards import Cards
+from components import Card, Element
+from packed import ELEMENT_SLOTS, EMPTY, RANKS, get_card_id
+from simulate import SimulationResults
+from topology import get_topology
+from triple_triad import Rules
+import constants
+
+import sys
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+POLICIES = ('first', 'random', 'greedy')
+
+# Candidate draws per game when dealing, beyond the cards the hands need; games short of cards draw again
+_EXTRA_DRAWS = 8
+
+# Rank directions facing back at a card, indexed by the direction from the card to its neighbor
+_OPPOSITE_DIRECTIONS = [2, 3, 0, 1]
+
+
+class BatchSimulator:
+
+    """ Class to play many games in lockstep, holding every board and hand in NumPy arrays
+
+    Each turn, every game places one card at once: the policies choose a (hand slot, cell)
+    for the player to move in each game, and the basic and elemental rules are resolved for
+    all placements in one vectorized step, with the same comparisons as
+    Rules.handle_card_placement. Same, Plus and Combo cascade from card to card and are not
+    supported, nor is Sudden Death, which replays drawn games.
+
+    Hands are dealt from Cards.cards with the same distribution as Cards.deal_cards, spaces
+    get elements like the elemental rule's grid, and the first player is drawn per game.
+
+    Attributes:
+        number_of_games (int): The number of games in the batch
+        rules (Rules): The rules of every game
+        width (int): The number of spaces in each row of the board
+        height (int): The number of spaces in each column of the board
+        policies (Tuple(str)): How each player chooses moves: 'first', 'random' or 'greedy'
+        cards (ndarray): Card id in each game and cell, EMPTY when the cell is free
+        owners (ndarray): Player index owning each game and cell, -1 when the cell is free
+        hands (ndarray): Card id in each game, player and hand slot, EMPTY once played
+        cell_elements (ndarray): Element value of each game and cell
+        first_players (ndarray): Player index to move first in each game
+        moves (List[ndarray]): The (hand slot, cell) played in each game on each turn so far
+
+    Methods:
+        run: Plays every game to the end and returns the final scores
+        step: Places one card in every game
+        get_placement_flips: Returns which neighbors a set of candidate placements would flip in each game
+        get_scores: Returns the scores of each player in each game
+        get_results: Returns the final scores counted as SimulationResults
+    """
+
+    def __init__(self, number_of_games, rules=None, width=constants.GAME_GRID_WIDTH,
+                 height=constants.GAME_GRID_HEIGHT, policies=('random', 'random'), seed=None):
+        if numpy is None:
+            raise ImportError('BatchSimulator requires NumPy: pip install numpy')
+        rules = rules or Rules()
+        if rules.is_same or rules.is_plus or rules.is_same_wall or rules.is_sudden_death:
+            raise ValueError('BatchSimulator supports only the basic and elemental rules')
+        if len(policies) != constants.NUMBER_OF_PLAYERS or any(policy not in POLICIES for policy in policies):
+            raise ValueError('Unknown policies: ' + str(policies))
+
+        self.number_of_games = number_of_games
+        self.rules = rules
+        self.width = width
+        self.height = height
+        self.policies = tuple(policies)
+        self._random = numpy.random.default_rng(seed)
+
+        cell_count = width * height
+        self._cells_in_hand = cell_count // 2 + 1
+        self._turn = 0
+
+        self._build_card_tables()
+        self._neighbors = numpy.array(get_topology(width, height, False).neighbors, dtype=numpy.intp).reshape(-1, 4)
+
+        self.cards = numpy.full((number_of_games, cell_count), EMPTY, dtype=numpy.int16)
+        self.owners = numpy.full((number_of_games, cell_count), -1, dtype=numpy.int8)
+        self.hands = self._deal_hands()
+        self.cell_elements = self._draw_cell_elements()
+        self._elemental_modifiers = self._build_elemental_modifiers()
+        self.first_players = self._random.integers(0, constants.NUMBER_OF_PLAYERS, number_of_games, dtype=numpy.int8)
+        self.moves = []
+
+    def _build_card_tables(self):
+        cards_by_level = list(Cards().cards.values())
+        no_duplicates_in_play_level = Cards().no_duplicates_in_play_level
+        # Deal numbers index the cards level by level, as Cards.deal_cards counts them
+        self._dealt_card_ids = numpy.array([get_card_id(card) for cards in cards_by_level for card in cards],
+                                           dtype=numpy.int16)
+        self._single_copy = numpy.array([level_index + 1 >= no_duplicates_in_play_level or card.name == 'PuPu'
+                                         for level_index, cards in enumerate(cards_by_level) for card in cards])
+        self._deal_mean = len(self._dealt_card_ids) / 2
+
+        card_count = len(RANKS) // 4
+        self._ranks = numpy.array(RANKS, dtype=numpy.int16).reshape(card_count, 4)
+        self._facing_ranks = self._ranks[:, _OPPOSITE_DIRECTIONS]
+        self._card_elements = numpy.array([Card.get_by_id(card_id).element.value for card_id in range(card_count)],
+                                          dtype=numpy.intp)
+
+    def _deal_hands(self):
+        """ Draws card numbers from the normal distribution Cards.deal_cards uses, a batch of candidates per game.
+            A card dealt once only in play is skipped when it was drawn earlier in the game, and only an in-range
+            draw can be dealt, so a single copy card is skipped exactly when an earlier in-range draw matches it.
+        """
+        dealt_count = self._cells_in_hand * constants.NUMBER_OF_PLAYERS
+        draws = dealt_count + _EXTRA_DRAWS
+        total_cards = len(self._dealt_card_ids)
+
+        numbers = numpy.empty((self.number_of_games, dealt_count), dtype=numpy.intp)
+        pending = numpy.arange(self.number_of_games)
+        while len(pending):
+            candidates = numpy.rint(self._random.normal(self._deal_mean, 15, (len(pending), draws))).astype(numpy.intp)
+            in_range = (candidates >= 0) & (candidates < total_cards)
+            # Out of range draws get distinct values so they never match an earlier draw
+            candidates = numpy.where(in_range, candidates, -1 - numpy.arange(draws))
+
+            order = numpy.argsort(candidates, axis=1, kind='stable')
+            ordered = numpy.take_along_axis(candidates, order, axis=1)
+            repeated = numpy.zeros_like(in_range)
+            repeated[:, 1:] = ordered[:, 1:] == ordered[:, :-1]
+            drawn_before = numpy.empty_like(repeated)
+            numpy.put_along_axis(drawn_before, order, repeated, axis=1)
+
+            dealt = in_range & ~(drawn_before & self._single_copy[numpy.where(in_range, candidates, 0)])
+            dealt &= numpy.cumsum(dealt, axis=1) <= dealt_count
+            complete = dealt.sum(axis=1) == dealt_count
+            numbers[pending[complete]] = candidates[complete][dealt[complete]].reshape(-1, dealt_count)
+            pending = pending[~complete]
+
+        # The first player's hand is dealt first
+        return self._dealt_card_ids[numbers].reshape(self.number_of_games, constants.NUMBER_OF_PLAYERS,
+                                                     self._cells_in_hand)
+
+    def _draw_cell_elements(self):
+        shape = (self.number_of_games, self.width * self.height)
+        elements = numpy.full(shape, Element.NONE.value, dtype=numpy.intp)
+        if self.rules.is_elemental:
+            # Half the spaces get no element, the rest any element, Element.NONE included
+            has_element = self._random.integers(0, 2, shape).astype(bool)
+            drawn = self._random.integers(1, len(Element) + 1, shape)
+            elements[has_element] = drawn[has_element]
+        return elements
+
+    def _build_elemental_modifiers(self):
+        # Entry [game, cell, card element value] is the rank modifier for a card in the cell
+        element_values = numpy.arange(ELEMENT_SLOTS)
+        cell_elements = self.cell_elements[:, :, numpy.newaxis]
+        modifiers = numpy.where(element_values == cell_elements, 1, -1).astype(numpy.int16)
+        modifiers[numpy.broadcast_to(cell_elements == Element.NONE.value, modifiers.shape)] = 0
+        return modifiers
+
+    def get_current_players(self):
+        return (self.first_players + self._turn) % constants.NUMBER_OF_PLAYERS
+
+    def _get_neighbor_defences(self, cells, players):
+        """ cells is a (games, candidates) array, or a (candidates,) array shared by every game. Returns
+            (games, candidates, 4) arrays of whether the neighbor in each direction of a cell belongs to the
+            opponent of each game's player, and the rank with modifier it defends that cell's side with.
+        """
+        games = numpy.arange(self.number_of_games)[:, numpy.newaxis, numpy.newaxis]
+        neighbors = self._neighbors[cells]
+        on_board = neighbors >= 0
+        neighbors = numpy.where(on_board, neighbors, 0)
+
+        neighbor_cards = self.cards[games, neighbors]
+        opponents = on_board & (self.owners[games, neighbors] == (1 - players)[:, numpy.newaxis, numpy.newaxis])
+        # Empty cells are never opponents, so their EMPTY card ids only index a placeholder row
+        defences = self._facing_ranks[neighbor_cards, numpy.arange(4)] + \
+            self._elemental_modifiers[games, neighbors, self._card_elements[neighbor_cards]]
+        return opponents, defences
+
+    def get_placement_flips(self, card_ids, cells, players):
+        """ card_ids and cells are (games, candidates) arrays of placements by each game's player. Returns a
+            (games, candidates, 4) array of whether the neighbor in each direction would be flipped.
+        """
+        opponents, defences = self._get_neighbor_defences(cells, players)
+        games = numpy.arange(self.number_of_games)[:, numpy.newaxis]
+        attacks = self._ranks[card_ids] + \
+            self._elemental_modifiers[games, cells, self._card_elements[card_ids]][..., numpy.newaxis]
+        return opponents & (attacks > defences)
+
+    def _choose_moves(self, players):
+        games = numpy.arange(self.number_of_games)
+        hands = self.hands[games, players]
+        in_hand = hands != EMPTY
+        free = self.cards == EMPTY
+        slots = numpy.zeros(self.number_of_games, dtype=numpy.intp)
+        cells = numpy.zeros(self.number_of_games, dtype=numpy.intp)
+
+        for player, policy in enumerate(self.policies):
+            moving = players == player
+            if policy == 'first':
+                slots[moving] = in_hand[moving].argmax(axis=1)
+                cells[moving] = free[moving].argmax(axis=1)
+            elif policy == 'random':
+                # The largest random key among the legal choices is a uniform choice
+                slots[moving] = numpy.where(in_hand[moving], self._random.random(in_hand[moving].shape), -1).argmax(1)
+                cells[moving] = numpy.where(free[moving], self._random.random(free[moving].shape), -1).argmax(1)
+
+        greedy = numpy.array([policy == 'greedy' for policy in self.policies])[players]
+        if greedy.any():
+            # Score every (slot, cell) pair by the cards it flips, breaking ties at random
+            cell_count = self.width * self.height
+            card_ids = numpy.where(in_hand, hands, 0)
+            all_cells = numpy.arange(cell_count)
+            opponents, defences = self._get_neighbor_defences(all_cells, players)
+            modifiers = self._elemental_modifiers[games[:, numpy.newaxis, numpy.newaxis], all_cells,
+                                                  self._card_elements[card_ids][:, :, numpy.newaxis]]
+            attacks = self._ranks[card_ids][:, :, numpy.newaxis, :] + modifiers[..., numpy.newaxis]
+            flips = (opponents[:, numpy.newaxis] & (attacks > defences[:, numpy.newaxis])).sum(axis=3)
+            flips = flips.reshape(self.number_of_games, -1)
+            legal = (in_hand[:, :, numpy.newaxis] & free[:, numpy.newaxis, :]).reshape(self.number_of_games, -1)
+            scores = numpy.where(legal, flips + self._random.random(flips.shape), -1)
+            best = scores.argmax(axis=1)
+            slots[greedy] = best[greedy] // cell_count
+            cells[greedy] = best[greedy] % cell_count
+
+        return slots, cells
+
+    def step(self):
+        games = numpy.arange(self.number_of_games)
+        players = self.get_current_players()
+        slots, cells = self._choose_moves(players)
+        card_ids = self.hands[games, players, slots]
+
+        flips = self.get_placement_flips(card_ids[:, numpy.newaxis], cells[:, numpy.newaxis], players)[:, 0]
+        self.cards[games, cells] = card_ids
+        self.owners[games, cells] = players
+        self.hands[games, players, slots] = EMPTY
+        flipped_games, directions = numpy.nonzero(flips)
+        self.owners[flipped_games, self._neighbors[cells[flipped_games], directions]] = players[flipped_games]
+
+        self.moves.append(numpy.stack((slots, cells), axis=1))
+        self._turn += 1
+
+    def run(self):
+        while self._turn < self.width * self.height:
+            self.step()
+        return self.get_scores()
+
+    def get_scores(self):
+        """Returns a (games, players) array of each player's cards on the board and in hand"""
+        return numpy.stack([(self.owners == player).sum(axis=1) + (self.hands[:, player] != EMPTY).sum(axis=1)
+                            for player in range(constants.NUMBER_OF_PLAYERS)], axis=1)
+
+    def get_results(self):
+        scores = self.get_scores()
+        results = SimulationResults()
+        results.games = self.number_of_games
+        results.wins = int((scores[:, 0] > scores[:, 1]).sum())
+        results.losses = int((scores[:, 0] < scores[:, 1]).sum())
+        results.draws = results.games - results.wins - results.losses
+        results.total_scores = [int(total) for total in scores.sum(axis=0)]
+        return results
+
+
+def simulate_batches(number_of_games, batch_size, rules_options, board_size, policies, seed):
+    """Yields the running totals after each batch of games"""
+    totals = SimulationResults()
+    start = time.perf_counter()
+    rules = Rules(**rules_options)
+    seeds = numpy.random.SeedSequence(seed).spawn((number_of_games + batch_size - 1) // batch_size)
+    for batch_seed in seeds:
+        games_left = number_of_games - totals.games
+        simulator = BatchSimulator(min(batch_size, games_left), rules, *board_size, policies, batch_seed)
+        simulator.run()
+        totals.merge(simulator.get_results())
+        totals.elapsed_seconds = time.perf_counter() - start
+        yield totals
+
+
+def read_command(argv):
+    from optparse import OptionParser
+    usage_str = """
+  USAGE:      python batch.py <options>
+  EXAMPLES:   (1) python batch.py -n 1000000
+                  - plays a million games between random policies with the basic rule
+              (2) python batch.py -n 100000 --policies greedy,random --elemental
+                  - plays greedy against random moves using the elemental rule
+  """
+    parser = OptionParser(usage_str)
+    parser.add_option('-n', '--games', dest='number_of_games', type='int', default=100000,
+                      help='the number of games to play')
+    parser.add_option('--policies', dest='policies', default='random,random',
+                      help='comma separated policies for each player: ' + ', '.join(POLICIES))
+    parser.add_option('-b', '--batch-size', dest='batch_size', type='int', default=10000,
+                      help='the number of games played in lockstep before reporting')
+    parser.add_option('--seed', dest='seed', type='int', default=0,
+                      help='the seed of the first batch')
+    parser.add_option('--width', dest='width', type='int', default=constants.GAME_GRID_WIDTH,
+                      help='the number of spaces in each row of the board')
+    parser.add_option('--height', dest='height', type='int', default=constants.GAME_GRID_HEIGHT,
+                      help='the number of spaces in each column of the board')
+    parser.add_option('-e', '--elemental', dest='use_elemental_rule', action='store_true',
+                      help='the games will observe the elemental rule')
+
+    options, junk = parser.parse_args(argv)
+    if len(junk) != 0:
+        raise Exception('Command line input not understood: ' + str(junk))
+
+    policies = options.policies.split(',')
+    if len(policies) != constants.NUMBER_OF_PLAYERS or any(policy not in POLICIES for policy in policies):
+        raise Exception('Policies not understood: ' + options.policies)
+
+    parsed_arguments = dict()
+    parsed_arguments['number_of_games'] = options.number_of_games
+    parsed_arguments['batch_size'] = options.batch_size
+    parsed_arguments['seed'] = options.seed
+    parsed_arguments['board_size'] = (options.width, options.height)
+    parsed_arguments['policies'] = tuple(policies)
+    parsed_arguments['rules_options'] = {'use_elemental': options.use_elemental_rule or False}
+
+    return parsed_arguments
+
+
+# Entry point for vectorized batch simulations
+if __name__ == '__main__':
+
+    arguments = read_command(sys.argv[1:])
+
+    for results in simulate_batches(**arguments):
+        print(results)
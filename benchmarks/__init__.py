@@ -0,0 +1 @@
+from benchmarks.runner import run_benchmarks, compare_to_baseline
@@ -0,0 +1,77 @@
+from benchmarks.runner import run_benchmarks, compare_to_baseline
+
+import json
+import os
+import sys
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def read_command(argv):
+    from optparse import OptionParser
+    usage_str = """
+  USAGE:      python -m benchmarks <options>
+  EXAMPLES:   (1) python -m benchmarks
+                  - runs every benchmark and compares it to the stored baseline
+              (2) python -m benchmarks --save-baseline
+                  - runs every benchmark and stores the results as the new baseline
+              (3) python -m benchmarks -b minmax.nodes -o results.json
+                  - runs one benchmark and writes the JSON report to a file
+  """
+    parser = OptionParser(usage_str)
+    parser.add_option('-b', '--benchmark', dest='names', action='append',
+                      help='a benchmark to run; may be given more than once')
+    parser.add_option('-o', '--output', dest='output',
+                      help='write the JSON report to this file instead of standard output')
+    parser.add_option('--baseline', dest='baseline', default=BASELINE_PATH,
+                      help='the baseline report to compare against')
+    parser.add_option('--save-baseline', dest='save_baseline', action='store_true',
+                      help='store the results as the baseline instead of comparing')
+    parser.add_option('--tolerance', dest='tolerance', type='float', default=0.2,
+                      help='the fraction of throughput that may be lost, or of memory gained, before it counts '
+                           'as a regression')
+    parser.add_option('--scale', dest='scale', type='int', default=1,
+                      help='multiplies the amount of work each benchmark does')
+    parser.add_option('--repeat', dest='repeat', type='int', default=5,
+                      help='the number of runs per benchmark; the fastest is kept')
+
+    options, junk = parser.parse_args(argv)
+    if len(junk) != 0:
+        raise Exception('Command line input not understood: ' + str(junk))
+    return options
+
+
+# Entry point for the engine benchmarks
+if __name__ == '__main__':
+
+    options = read_command(sys.argv[1:])
+    report = run_benchmarks(options.names, options.scale, options.repeat)
+
+    report_json = json.dumps(report, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            output_file.write(report_json + '\n')
+    else:
+        print(report_json)
+
+    if options.save_baseline:
+        with open(options.baseline, 'w') as baseline_file:
+            baseline_file.write(report_json + '\n')
+        sys.exit(0)
+
+    if not os.path.exists(options.baseline):
+        sys.exit(0)
+
+    with open(options.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    regressions = 0
+    for name, baseline_value, current_value, unit, ratio, is_regression in compare_to_baseline(
+            report, baseline, options.tolerance):
+        regressions += is_regression
+        print('{:<40s} {:>14.1f} -> {:>14.1f} {:<9s}  {:6.2f}x{}'.format(
+            name, baseline_value, current_value, unit, ratio, '  REGRESSION' if is_regression else ''),
+            file=sys.stderr)
+
+    sys.exit(1 if regressions else 0)
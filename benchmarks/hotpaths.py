@@ -0,0 +1,251 @@
+from agents import FirstAvailableAgent, MinMaxAgent, MonteCarloAgent
+from cards import Cards
+from game import Game, GameState, Grid
+from textdisplay import NullGraphics
+from triple_triad import Rules
+
+import copy
+import random
+import time
+import tracemalloc
+
+
+BENCHMARKS = {}
+MEMORY_BENCHMARKS = {}
+
+RULE_COMBINATIONS = {
+    'basic': {},
+    'elemental': {'use_elemental': True},
+    'same': {'use_same': True},
+    'same_wall': {'use_same': True, 'use_same_wall': True},
+    'plus': {'use_plus': True},
+    'combo': {'use_same': True, 'use_plus': True},
+}
+
+
+def benchmark(name):
+    """Registers a function returning (operations, seconds) as a benchmark"""
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def memory_benchmark(name):
+    """Registers a function returning (objects, bytes retained) as a memory benchmark"""
+    def register(function):
+        MEMORY_BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def _measure_retained_bytes(build, count):
+    """Returns the bytes still allocated after calling build count times and keeping every result"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [build() for _ in range(count)]
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del kept
+    return retained
+
+
+def _make_midgame_states(rules_options, count, cards_on_board=4, seed=0):
+    """Returns game states with a few random cards already played, at fixed seeds"""
+    states = []
+    for index in range(count):
+        random.seed(seed + index)
+        agents = [FirstAvailableAgent(0), FirstAvailableAgent(1)]
+        state = GameState(agents, Rules(**rules_options))
+        hands = Cards().deal_cards()
+        for agent, hand in zip(agents, hands):
+            agent.set_hand(hand)
+
+        agent_index = state.current_turn_index
+        for _ in range(cards_on_board):
+            free_spaces = list(state.get_game_board().iter_free_spaces())
+            card_index = random.randrange(len(agents[agent_index].hand))
+            state.apply_move(agent_index, (card_index, random.choice(free_spaces)))
+            agent_index = 1 - agent_index
+        state.current_turn_index = agent_index
+        states.append(state)
+    return states
+
+
+@benchmark('generate_successor')
+def bench_generate_successor(scale):
+    states = _make_midgame_states({'use_same': True, 'use_plus': True}, 20 * scale)
+    operations = 0
+    start = time.perf_counter()
+    for state in states:
+        agent_index = state.current_turn_index
+        for action in list(state.iter_legal_actions(state.get_current_player())):
+            state.generate_successor(agent_index, action)
+            operations += 1
+    elapsed = time.perf_counter() - start
+    return operations, elapsed
+
+
+def _bench_card_placement(rules_options, scale):
+    """Times Grid.apply_move, which places the card and resolves it with Rules.handle_card_placement"""
+    states = _make_midgame_states(rules_options, 100 * scale)
+    operations = 0
+    elapsed = 0.0
+    for state in states:
+        agent = state.get_current_player()
+        board = state.get_game_board()
+        for card in list(agent.hand):
+            for coordinates in list(board.iter_free_spaces()):
+                start = time.perf_counter()
+                token = board.apply_move(agent, card, coordinates)
+                elapsed += time.perf_counter() - start
+                operations += 1
+                board.undo_move(token)
+    return operations, elapsed
+
+
+def _register_card_placement_benchmarks():
+    for rules_name, rules_options in RULE_COMBINATIONS.items():
+        benchmark('handle_card_placement.' + rules_name)(
+            lambda scale, rules_options=rules_options: _bench_card_placement(rules_options, scale))
+
+
+_register_card_placement_benchmarks()
+
+
+@benchmark('evaluate_placements')
+def bench_evaluate_placements(scale):
+    """Outcomes per second of every legal action, the work generate_successor does one copy at a time"""
+    states = _make_midgame_states({'use_same': True, 'use_plus': True}, 20 * scale)
+    operations = 0
+    start = time.perf_counter()
+    for state in states:
+        operations += len(state.evaluate_placements(state.get_current_player()))
+    elapsed = time.perf_counter() - start
+    return operations, elapsed
+
+
+@benchmark('get_free_spaces_dict')
+def bench_get_free_spaces_dict(scale):
+    boards = [state.get_game_board() for state in _make_midgame_states({}, 10)]
+    repeats = 2000 * scale
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for board in boards:
+            board.get_free_spaces_dict()
+    return repeats * len(boards), time.perf_counter() - start
+
+
+@benchmark('iter_legal_actions')
+def bench_iter_legal_actions(scale):
+    states = _make_midgame_states({}, 10)
+    repeats = 500 * scale
+    operations = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for state in states:
+            for _ in state.iter_legal_actions(state.get_current_player()):
+                operations += 1
+    return operations, time.perf_counter() - start
+
+
+@benchmark('deal_cards')
+def bench_deal_cards(scale):
+    random.seed(0)
+    cards = Cards()
+    repeats = 2000 * scale
+    start = time.perf_counter()
+    for _ in range(repeats):
+        cards.deal_cards()
+    return repeats, time.perf_counter() - start
+
+
+@benchmark('full_game.first_available')
+def bench_full_game(scale):
+    games = 100 * scale
+    start = time.perf_counter()
+    for seed in range(games):
+        random.seed(seed)
+        agents = [FirstAvailableAgent(0), FirstAvailableAgent(1)]
+        Game(agents, NullGraphics(), Rules(use_same=True, use_plus=True)).run()
+    elapsed = time.perf_counter() - start
+    return games, elapsed
+
+
+def _bench_minmax_nodes(scale, evaluation):
+    states = _make_midgame_states({'use_same': True, 'use_plus': True}, 2 * scale, cards_on_board=0)
+    nodes = 0
+    start = time.perf_counter()
+    for state in states:
+        agent_index = state.current_turn_index
+        agent = MinMaxAgent(agent_index, depth=5, endgame_threshold=0, move_time_ms=None, evaluation=evaluation)
+        agent.set_hand(state.get_agents()[agent_index].hand)
+        state.get_agents()[agent_index] = agent
+        agent.get_action(state)
+        nodes += agent.nodes_searched
+    elapsed = time.perf_counter() - start
+    return nodes, elapsed
+
+
+@benchmark('minmax.nodes')
+def bench_minmax_nodes(scale):
+    """Nodes per second of a fixed depth search from the opening, at fixed seeds"""
+    return _bench_minmax_nodes(scale, 'score')
+
+
+@benchmark('minmax.positional_nodes')
+def bench_minmax_positional_nodes(scale):
+    """Nodes per second of the same search scoring its leaves with the positional evaluation"""
+    return _bench_minmax_nodes(scale, 'positional')
+
+
+@benchmark('mcts.rollouts')
+def bench_mcts_rollouts(scale):
+    """Rollouts per second of a fixed budget search from the opening, at fixed seeds"""
+    states = _make_midgame_states({'use_same': True, 'use_plus': True}, 2 * scale, cards_on_board=0)
+    rollouts = 0
+    start = time.perf_counter()
+    for state in states:
+        agent_index = state.current_turn_index
+        agent = MonteCarloAgent(agent_index, iterations=500)
+        agent.set_hand(state.get_agents()[agent_index].hand)
+        state.get_agents()[agent_index] = agent
+        agent.get_action(state)
+        rollouts += agent.rollouts
+    elapsed = time.perf_counter() - start
+    return rollouts, elapsed
+
+
+@memory_benchmark('memory.game_state')
+def bench_game_state_memory(scale):
+    """Bytes per new GameState with dealt hands, agents included"""
+    random.seed(0)
+    count = 1000 * scale
+    rules = Rules()
+    hands = Cards().deal_cards()
+
+    def build():
+        agents = [FirstAvailableAgent(0), FirstAvailableAgent(1)]
+        for agent, hand in zip(agents, hands):
+            agent.set_hand(hand)
+        return GameState(agents, rules)
+    return count, _measure_retained_bytes(build, count)
+
+
+@memory_benchmark('memory.game_state_copy')
+def bench_game_state_copy_memory(scale):
+    """Bytes per deep copy of a midgame GameState, as made for every successor"""
+    state = _make_midgame_states({'use_same': True, 'use_plus': True}, 1)[0]
+    count = 1000 * scale
+    return count, _measure_retained_bytes(lambda: copy.deepcopy(state), count)
+
+
+@memory_benchmark('memory.grid')
+def bench_grid_memory(scale):
+    """Bytes per new empty Grid"""
+    random.seed(0)
+    count = 1000 * scale
+    rules = Rules()
+    return count, _measure_retained_bytes(lambda: Grid(rules), count)
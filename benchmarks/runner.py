@@ -0,0 +1,80 @@
+from benchmarks.hotpaths import BENCHMARKS, MEMORY_BENCHMARKS
+
+import platform
+import time
+
+
+def run_benchmarks(names=None, scale=1, repeat=5):
+    """ Runs the named benchmarks, or all of them, keeping the fastest of repeated runs.
+        Memory benchmarks are deterministic and run once. Returns a dict of results that serializes to JSON.
+    """
+    results = {}
+    for name in sorted(names or list(BENCHMARKS) + list(MEMORY_BENCHMARKS)):
+        if name in MEMORY_BENCHMARKS:
+            try:
+                objects, retained_bytes = MEMORY_BENCHMARKS[name](scale)
+            except Exception as error:
+                results[name] = {'error': '{}: {}'.format(type(error).__name__, error)}
+                continue
+            results[name] = {
+                'objects': objects,
+                'bytes': retained_bytes,
+                'bytes_per_object': retained_bytes / objects,
+            }
+            continue
+
+        best = None
+        try:
+            for _ in range(repeat):
+                operations, seconds = BENCHMARKS[name](scale)
+                if best is None or seconds / operations < best[1] / best[0]:
+                    best = operations, seconds
+        except Exception as error:
+            # A broken hot path is reported rather than stopping the suite
+            results[name] = {'error': '{}: {}'.format(type(error).__name__, error)}
+            continue
+
+        operations, seconds = best
+        results[name] = {
+            'operations': operations,
+            'seconds': seconds,
+            'ops_per_sec': operations / seconds,
+            'us_per_op': seconds / operations * 1e6,
+        }
+
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'scale': scale,
+        'benchmarks': results,
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance=0.2):
+    """ Compares throughput, and bytes per object for memory benchmarks, against a baseline report.
+        Returns a list of (name, baseline value, current value, unit, ratio, is_regression),
+        where a ratio above 1 is an improvement.
+    """
+    comparisons = []
+    for name, result in sorted(report['benchmarks'].items()):
+        baseline_result = baseline['benchmarks'].get(name)
+        if name in MEMORY_BENCHMARKS:
+            if baseline_result is None or 'bytes_per_object' not in baseline_result:
+                continue
+            if 'bytes_per_object' not in result:
+                comparisons.append((name, baseline_result['bytes_per_object'], 0.0, 'bytes/obj', 0.0, True))
+                continue
+            ratio = baseline_result['bytes_per_object'] / result['bytes_per_object']
+            comparisons.append((name, baseline_result['bytes_per_object'], result['bytes_per_object'], 'bytes/obj',
+                                ratio, ratio < 1 / (1 + tolerance)))
+            continue
+        if baseline_result is None or 'ops_per_sec' not in baseline_result:
+            continue
+        if 'ops_per_sec' not in result:
+            comparisons.append((name, baseline_result['ops_per_sec'], 0.0, 'ops/sec', 0.0, True))
+            continue
+        ratio = result['ops_per_sec'] / baseline_result['ops_per_sec']
+        comparisons.append((name, baseline_result['ops_per_sec'], result['ops_per_sec'], 'ops/sec', ratio,
+                            ratio < 1 - tolerance))
+    return comparisons
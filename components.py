@@ -46,11 +46,21 @@ class Card:
         right (int): The value of the right rank
         bottom (int): The value of the bottom rank
         element (Element): The element of the card
+        card_id (int): A small int identifying the card, numbered in the order cards are created
+
+    Cards are interned: each card is created once and shared by every deck, hand and board,
+    so cards compare and hash by identity.
 
     Methods:
         get_rank: Returns card rank by direction, with option for string rank
+        get_by_id: Returns the card with a given card id
+        count_cards: Returns the number of cards created so far
     """
 
+    __slots__ = ('_name', '_ranks', '_element', '_card_id')
+
+    _cards_by_id = []
+
     def __init__(self, name, top, left, right, bottom, element=Element.NONE):
         self._name = name
         self._ranks = {
@@ -61,6 +71,9 @@ class Card:
         }
         self._element = element
 
+        self._card_id = len(Card._cards_by_id)
+        Card._cards_by_id.append(self)
+
     def __str__(self):
         full_width = str(constants.MAXIMUM_CHARACTERS_IN_CARD_NAME)
         half_width = str(round(constants.MAXIMUM_CHARACTERS_IN_CARD_NAME / 2))
@@ -80,12 +93,16 @@ class Card:
                                     string_element, Card.get_string_rank(self._ranks[Direction.BOTTOM]),
                                     str(self._element))
 
-    def __eq__(self, other):
-        if other is None:
-            return False
-        if other.name == self.name:
-            return True
-        return False
+    def __deepcopy__(self, memo_dict={}):
+        return self
+
+    @staticmethod
+    def get_by_id(card_id):
+        return Card._cards_by_id[card_id]
+
+    @staticmethod
+    def count_cards():
+        return len(Card._cards_by_id)
 
     @staticmethod
     def get_string_rank(int_rank):
@@ -108,3 +125,7 @@ class Card:
     @property
     def element(self):
         return self._element
+
+    @property
+    def card_id(self):
+        return self._card_id
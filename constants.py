@@ -1,7 +1,13 @@
 GAME_GRID_HEIGHT = 3
 GAME_GRID_WIDTH = 3
 
+# The search keys positions by space index, so larger boards can't be played
+MAXIMUM_GRID_SPACES = 64
+
 NUMBER_OF_PLAYERS = 2
 NUMBER_OF_CARDS_IN_HAND = 5
 
+# The computer player's search budget per move when no other is given
+DEFAULT_MOVE_TIME_MS = 1000
+
 MAXIMUM_CHARACTERS_IN_CARD_NAME = 14
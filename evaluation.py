@@ -0,0 +1,196 @@
+from cards import Cards
+from components import Card, Element
+from packed import RANKS
+from topology import DIRECTIONS, get_topology
+
+from collections import OrderedDict
+
+# Each card the player owns is worth this much, as in the plain score difference
+SCORE_WEIGHT = 100
+
+# Effective ranks run from 0 (a 1 on a conflicting element) to 11 (an A on a matching element)
+_RANK_SLOTS = 13
+
+# Tables of the most recently used board layouts, shared by every PositionalEvaluation
+_TABLE_CACHE_SIZE = 16
+_table_cache = OrderedDict()
+
+
+def _get_modifier(cell_element, card_element):
+    if cell_element is Element.NONE:
+        return 0
+    return 1 if card_element is cell_element else -1
+
+
+class ScoreEvaluation:
+
+    """ Class to evaluate positions by the score difference alone
+
+    Methods:
+        prepare: Readies the evaluation for the positions of a game; nothing to do for the score
+        evaluate: Returns SCORE_WEIGHT times the player's score lead in a PackedState
+    """
+
+    def prepare(self, packed_state):
+        pass
+
+    def evaluate(self, packed_state, player):
+        scores = packed_state.scores
+        return SCORE_WEIGHT * (scores[player] - scores[1 - player])
+
+
+class PositionalEvaluation(ScoreEvaluation):
+
+    """ Class to evaluate positions by the score difference and where the cards stand
+
+    Besides the score, a player gains for each card in hand by how many cards of
+    Cards.cards it beats on an average side, and loses for each card it owns on the
+    board by how many cards could flip it from the free spaces next to it. Sides facing
+    the edge of the board or a filled space can't be attacked, so cards in corners and
+    on edges, and cards that are boxed in, are safe. The opponent's cards count the
+    other way.
+
+    The chance of a side being beaten depends only on the card, its space and which
+    neighbors are free, so prepare tabulates it for every card, space and set of free
+    neighbors once per board layout, elemental modifiers included, and keeps the tables
+    of recent layouts for the next games. evaluate is then a table lookup per card.
+
+    Attributes:
+        exposure_weight (int): The value of a card no card in the pool can flip over one that every card can flip
+        hand_weight (int): The value of a card in hand that beats every card over one that beats none
+
+    Methods:
+        prepare: Builds the tables for the board layout of a PackedState, if not already built
+        evaluate: Returns the score and positional value for a player in a PackedState
+    """
+
+    def __init__(self, exposure_weight=40, hand_weight=30):
+        self.exposure_weight = exposure_weight
+        self.hand_weight = hand_weight
+
+        pool = [card for cards in Cards().cards.values() for card in cards]
+        self._pool_size = len(pool)
+        self._pool_card_ids = [card.card_id for card in pool]
+        self._pool = [(card.element, [card.get_rank(direction) for direction in DIRECTIONS]) for card in pool]
+
+        self._layout_key = None
+        self._exposures = None
+        self._hand_values = None
+        self._side_indexes = None
+        self._neighbor_masks = None
+
+    def _get_attacks_by_element(self, cell_element):
+        """ Returns, per direction of attack, the number of pool cards attacking from a space of cell_element that
+            beat each effective rank facing them. The attacker's rank is its rank in the opposite direction.
+        """
+        attacks = []
+        for direction in range(4):
+            beaten = [0] * _RANK_SLOTS
+            for card_element, ranks in self._pool:
+                attacking_rank = ranks[direction ^ 2] + _get_modifier(cell_element, card_element)
+                for rank in range(min(attacking_rank, _RANK_SLOTS)):
+                    beaten[rank] += 1
+            attacks.append(beaten)
+        return attacks
+
+    def prepare(self, packed_state):
+        card_count = len(RANKS) // 4
+        is_elemental = packed_state.rules.is_elemental
+        cell_elements = [element if is_elemental else Element.NONE for element in packed_state.cell_elements]
+        layout_key = (packed_state.width, packed_state.height, packed_state.rules.is_same_wall, card_count,
+                      tuple(element.value for element in cell_elements), self.exposure_weight, self.hand_weight)
+        if layout_key == self._layout_key:
+            return
+
+        tables = _table_cache.get(layout_key)
+        if tables is None:
+            tables = self._build_tables(packed_state, cell_elements, card_count)
+            if len(_table_cache) >= _TABLE_CACHE_SIZE:
+                _table_cache.popitem(last=False)
+            _table_cache[layout_key] = tables
+        _table_cache.move_to_end(layout_key)
+
+        self._exposures, self._hand_values, self._side_indexes, self._neighbor_masks = tables
+        self._layout_key = layout_key
+
+    def _build_tables(self, packed_state, cell_elements, card_count):
+        cell_count = packed_state.cell_count
+        topology = get_topology(packed_state.width, packed_state.height, packed_state.rules.is_same_wall)
+        attacks_by_element = {element: self._get_attacks_by_element(element) for element in set(cell_elements)}
+        card_elements = [Card.get_by_id(card_id).element for card_id in range(card_count)]
+
+        # Entry (card_id * cell_count + cell) * 16 + side index is the loss for the card's owner,
+        # where bit i of the side index is set when the card's i-th neighbor is free
+        exposures = [0] * (card_count * cell_count * 16)
+        for card_id in range(card_count):
+            card_element = card_elements[card_id]
+            for cell in range(cell_count):
+                modifier = _get_modifier(cell_elements[cell], card_element)
+                side_losses = []
+                for direction, neighbor in topology.adjacency[cell]:
+                    rank = max(0, min(RANKS[card_id * 4 + direction] + modifier, _RANK_SLOTS - 1))
+                    beaten = attacks_by_element[cell_elements[neighbor]][direction][rank]
+                    side_losses.append(self.exposure_weight * beaten / self._pool_size)
+                base = (card_id * cell_count + cell) * 16
+                for side_index in range(1 << len(side_losses)):
+                    exposures[base + side_index] = round(sum(loss for bit, loss in enumerate(side_losses)
+                                                             if side_index >> bit & 1))
+
+        # Each card in hand is valued by the share of the pool it beats on an average side, less the pool's average
+        attacks = attacks_by_element.get(Element.NONE) or self._get_attacks_by_element(Element.NONE)
+        beaten_shares = []
+        for card_id in range(card_count):
+            # Pool cards the card beats on a side are the ones not reaching its rank there
+            ranks = [min(RANKS[card_id * 4 + direction], _RANK_SLOTS) for direction in range(4)]
+            beaten = sum(self._pool_size - attacks[direction][rank - 1] for direction, rank in enumerate(ranks))
+            beaten_shares.append(beaten / (4 * self._pool_size))
+        average_share = sum(beaten_shares[card_id] for card_id in self._pool_card_ids) / self._pool_size
+        hand_values = [round(self.hand_weight * (share - average_share)) for share in beaten_shares]
+
+        neighbor_masks = [sum(1 << neighbor for _, neighbor in topology.adjacency[cell])
+                          for cell in range(cell_count)]
+        side_indexes_by_cell = []
+        for cell in range(cell_count):
+            side_indexes = {}
+            neighbor_bits = [1 << neighbor for _, neighbor in topology.adjacency[cell]]
+            for side_index in range(1 << len(neighbor_bits)):
+                free_neighbors = sum(bit for index, bit in enumerate(neighbor_bits) if side_index >> index & 1)
+                side_indexes[free_neighbors] = side_index
+            side_indexes_by_cell.append(side_indexes)
+        return exposures, hand_values, side_indexes_by_cell, neighbor_masks
+
+    def evaluate(self, packed_state, player):
+        scores = packed_state.scores
+        value = SCORE_WEIGHT * (scores[player] - scores[1 - player])
+
+        hand_values = self._hand_values
+        for card_id in packed_state.hands[player]:
+            value += hand_values[card_id]
+        for card_id in packed_state.hands[1 - player]:
+            value -= hand_values[card_id]
+
+        exposures = self._exposures
+        side_indexes = self._side_indexes
+        neighbor_masks = self._neighbor_masks
+        cells = packed_state.cells
+        cell_count = packed_state.cell_count
+        occupied = packed_state.occupied
+        free = packed_state.full_mask & ~occupied
+        # Set bits mark the cells the player owns
+        owned = packed_state.owners if player else ~packed_state.owners
+
+        while occupied:
+            lowest_bit = occupied & -occupied
+            cell = lowest_bit.bit_length() - 1
+            occupied ^= lowest_bit
+            free_neighbors = free & neighbor_masks[cell]
+            if free_neighbors:
+                exposure = exposures[(cells[cell] * cell_count + cell) * 16 + side_indexes[cell][free_neighbors]]
+                value += -exposure if owned & lowest_bit else exposure
+        return value
+
+
+EVALUATIONS = {
+    'score': ScoreEvaluation,
+    'positional': PositionalEvaluation,
+}
@@ -0,0 +1,95 @@
+class Event:
+    """Base class for game events"""
+    __slots__ = ()
+
+
+class PlacementEvent(Event):
+    """A card was placed on the game board"""
+    __slots__ = ('agent', 'card', 'coordinates')
+
+    def __init__(self, agent, card, coordinates):
+        self.agent = agent
+        self.card = card
+        self.coordinates = coordinates
+
+
+class FlipEvent(Event):
+    """A space on the game board changed owner"""
+    __slots__ = ('coordinates', 'previous_owner', 'new_owner')
+
+    def __init__(self, coordinates, previous_owner, new_owner):
+        self.coordinates = coordinates
+        self.previous_owner = previous_owner
+        self.new_owner = new_owner
+
+
+class SameEvent(Event):
+    """The Same rule flipped cards around the placed card"""
+    __slots__ = ('coordinates',)
+
+    def __init__(self, coordinates):
+        self.coordinates = coordinates
+
+
+class PlusEvent(Event):
+    """The Plus rule flipped cards around the placed card"""
+    __slots__ = ('coordinates',)
+
+    def __init__(self, coordinates):
+        self.coordinates = coordinates
+
+
+class ComboEvent(Event):
+    """Cards flipped by Same or Plus went on to flip their own neighbors"""
+    __slots__ = ('coordinates',)
+
+    def __init__(self, coordinates):
+        self.coordinates = coordinates
+
+
+class SuddenDeathEvent(Event):
+    """A round ended in a draw and Sudden Death starts another"""
+    __slots__ = ()
+
+
+class ThinkingEvent(Event):
+    """A computer player started searching for a move"""
+    __slots__ = ('agent',)
+
+    def __init__(self, agent):
+        self.agent = agent
+
+
+class EventBus:
+
+    """ Class to deliver game events to subscribed callbacks
+
+    Publishers check wants before building an event, so an event type nobody
+    subscribes to costs one dict lookup and no allocation.
+
+    Methods:
+        subscribe: Calls a callback with every published event of a given type
+        unsubscribe: Stops calling a callback for a given event type
+        wants: Returns true if any callback is subscribed to a given event type
+        publish: Calls the callbacks subscribed to the event's type
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+
+    def subscribe(self, event_type, callback):
+        self._subscribers.setdefault(event_type, []).append(callback)
+
+    def unsubscribe(self, event_type, callback):
+        callbacks = self._subscribers.get(event_type)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+            if not callbacks:
+                del self._subscribers[event_type]
+
+    def wants(self, event_type):
+        return event_type in self._subscribers
+
+    def publish(self, event):
+        for callback in self._subscribers.get(type(event), ()):
+            callback(event)
@@ -1,9 +1,45 @@
 import constants
-from cards import Cards
-from components import Direction, Element
+from cards import Cards, WALL_CARD
+from components import Element
+from events import EventBus, PlacementEvent, SuddenDeathEvent
+from packed import TRIGGERED_PLUS, TRIGGERED_SAME, PackedState
+from topology import OPPOSITE_DIRECTIONS, WALL, get_topology
 import utils
 import copy
 
+# Rank modifier for a card by the element of its space, then the card's element. Spaces keep
+# the row for their element, so every board and every copy of it shares these rows.
+ELEMENTAL_MODIFIERS = {
+    space_element: {
+        card_element: 0 if space_element is Element.NONE else 1 if card_element is space_element else -1
+        for card_element in Element
+    }
+    for space_element in Element
+}
+
+
+class PlacementOutcome:
+
+    """ Class to hold the immediate result of placing a card, as found by GameState.evaluate_placements
+
+    Attributes:
+        card_index (int): The index of the card in the player's hand
+        coordinates (Tuple[int]): The grid space the card would be placed in
+        flipped (List[Tuple[int]]): The coordinates of the spaces that would change owner
+        rules (Tuple[str]): The rules the placement triggers, in the order 'basic', 'same', 'plus', 'combo'. Same and
+            Plus are listed whenever Grid would announce them, even if they flip nothing themselves
+        score_delta (int): The change in the player's score; the other player's score changes by the opposite
+    """
+
+    __slots__ = ('card_index', 'coordinates', 'flipped', 'rules', 'score_delta')
+
+    def __init__(self, card_index, coordinates, flipped, rules):
+        self.card_index = card_index
+        self.coordinates = coordinates
+        self.flipped = flipped
+        self.rules = rules
+        self.score_delta = len(flipped)
+
 
 class GameState:
 
@@ -12,6 +48,8 @@ class GameState:
     Attributes:
         agents (List[Agent]): The player agents
         rules (Rules): The game rules
+        width (int): The width of the game board
+        height (int): The height of the game board
 
     Methods:
         initialize: Returns game state to initial state
@@ -22,13 +60,21 @@ class GameState:
         increment_player_turn: Increments turn index to next player
         get_legal_agent_actions: Returns a list of legal playable cards and
             a list of legal playable grid locations for a given player Agent
+        iter_legal_actions: Yields each legal (card_index, coordinates) for a given player Agent, optionally
+            skipping further copies of a card already in hand
+        evaluate_placements: Returns a PlacementOutcome for each legal action of a given player Agent,
+            without changing or copying the game state per action
         generate_successor: Returns a deepcopy of the game state where a
             player Agent has placed a given card in a given location
+        apply_move: Places a card in place for a player Agent and returns a token for undo_move
+        undo_move: Reverts a move made with apply_move using its token
         get_score: Returns the int score for a given player Agent
     """
 
-    def __init__(self, agents, rules):
-        self.data = GameStateData(agents=agents, game_board=Grid(rules))
+    __slots__ = ('data', 'current_turn_index', 'rules', 'winner')
+
+    def __init__(self, agents, rules, width=constants.GAME_GRID_WIDTH, height=constants.GAME_GRID_HEIGHT):
+        self.data = GameStateData(agents=agents, game_board=Grid(rules, width, height))
         self.current_turn_index = 0
         self.rules = rules
 
@@ -41,11 +87,13 @@ class GameState:
 
     def __deepcopy__(self, memo_dict={}):
         copied_agents = [copy.deepcopy(agent) for agent in self.data.agents]
-        copied_state = GameState(copied_agents, self.rules)
+        game_board = self.get_game_board()
+        copied_state = GameState(copied_agents, self.rules, game_board.width, game_board.height)
         copied_state.data.game_board = copy.deepcopy(self.get_game_board())
 
         # Update Agent data stored in game board to reflect copied agents
         copied_state.get_game_board().remap_owners_for_deepcopy(copied_agents)
+        copied_state.current_turn_index = self.current_turn_index
 
         return copied_state
 
@@ -70,21 +118,78 @@ class GameState:
 
         return legal_cards, legal_grid_spaces
 
+    def iter_legal_actions(self, agent, distinct=False):
+        free_spaces = tuple(self.data.game_board.iter_free_spaces())
+        card_ids = set()
+        for card_index, card in enumerate(agent.hand):
+            if distinct:
+                # Playing either copy of a card leads to the same state
+                if card.card_id in card_ids:
+                    continue
+                card_ids.add(card.card_id)
+            for coordinates in free_spaces:
+                yield card_index, coordinates
+
+    def evaluate_placements(self, agent):
+        """ The board is packed once and PackedState.get_placement_outcomes resolves every card against
+            every free space in one pass, looking up each space's neighbors once. Outcomes are listed in
+            iter_legal_actions order, and copies of a card share the first copy's outcome.
+        """
+        packed_state = PackedState.from_game_state(self)
+        hand = packed_state.hands[agent.index]
+        outcomes_by_card = {}
+        for card_index, cell, flipped, same, plus, combo, triggered in \
+                packed_state.get_placement_outcomes(agent.index):
+            rules = []
+            if flipped & ~(same | plus | combo):
+                rules.append('basic')
+            if triggered & TRIGGERED_SAME:
+                rules.append('same')
+            if triggered & TRIGGERED_PLUS:
+                rules.append('plus')
+            if combo:
+                rules.append('combo')
+            flipped_coordinates = [packed_state.get_coordinates(flipped_cell)
+                                   for flipped_cell in range(packed_state.cell_count) if flipped >> flipped_cell & 1]
+            outcomes_by_card[(hand[card_index], packed_state.get_coordinates(cell))] = \
+                (flipped_coordinates, tuple(rules))
+
+        return [PlacementOutcome(card_index, coordinates, *outcomes_by_card[(hand[card_index], coordinates)])
+                for card_index, coordinates in self.iter_legal_actions(agent)]
+
     def generate_successor(self, agent_index, action):
         # return a copy of the current game state after agent has taken action
         state_copy = copy.deepcopy(self)
-        card_index, coordinates = action
         # TODO Make sure card and grid space are legal and valid
-        agent = state_copy.data.agents[agent_index]
-        state_copy.get_game_board().place_card(agent, agent.hand[card_index], coordinates)
+        state_copy.apply_move(agent_index, action)
         return state_copy
 
+    def apply_move(self, agent_index, action):
+        """ Plays a card from an agent's hand in place, without copying the state.
+            Returns a token to pass to undo_move, or None if the grid space is taken.
+        """
+        card_index, coordinates = action
+        agent = self.data.agents[agent_index]
+        card = agent.take_card_from_hand(card_index)
+        board_token = self.data.game_board.apply_move(agent, card, coordinates)
+        if board_token is None:
+            agent.return_card_to_hand(card_index, card)
+            return None
+        return agent, card_index, card, board_token
+
+    def undo_move(self, token):
+        agent, card_index, card, board_token = token
+        self.data.game_board.undo_move(board_token)
+        agent.return_card_to_hand(card_index, card)
+
     def get_score(self, agent_index):
         return self.data.agents[agent_index].score
 
 
 class GameStateData:
 
+    __slots__ = ('agents', 'game_board')
+
     def __init__(self, agents, game_board):
         # Init game state
         self.agents = agents
@@ -101,12 +206,16 @@ class GameBoardLocation:
     Attributes:
         coordinates (Tuple(int)): The x and y coordinates the object is located on the game board
         is_elemental_rule_in_play (bool): Whether or not elemental rule is in play for the game
+        neighbors_coordinates (dict): Direction to the coordinates of each neighbor, walls included, from the
+            board's Topology
+        bit (int): The space's bit in the Grid's bitmasks, numbered y * width + x, or 0 for walls
 
     Methods:
         initialize: Returns the space to a fresh instance
         place_card: Handles placing a card in the given space
+        remove_card: Empties the space, keeping its element
         set_owner: Handles setting the owner of the space to a given Agent
-        calculate_location_value: Calculates the total rank of a space given a Direction
+        calculate_location_value: Calculates the total rank of a space given a Direction, with its elemental modifier
         get_location_rank: Returns the rank of the placed card given a direction
         get_coordinates: Returns the coordinates of the GameBoardLocation object
         get_combo_neighbors: Returns all neighbors with smaller adjoining ranks for use with Combo rule
@@ -117,36 +226,44 @@ class GameBoardLocation:
         get_sum: Returns sum of the card's and neighbor's card ranks in a given Direction
         is_greater: Returns true if location rank is greater than neighboring rank
         _get_element_for_grid: For initialization purposes; returns an element to assign to the space
-        _calculate_neighbors: For initialization purposes; generates a dictionary of neighboring GameBoardLocations
     """
 
-    def __init__(self, coordinates, is_elemental_rule_in_play=False, is_same_wall_rule_in_play=False):
+    __slots__ = ('_has_card', '_placed_card', '_use_elemental_rule', '_has_element', '_element',
+                 '_elemental_modifiers', '_grid_coordinates', '_bit', 'owner', '_neighbors_coordinates', 'neighbors')
+
+    def __init__(self, coordinates, is_elemental_rule_in_play=False, neighbors_coordinates=None, bit=0):
         self._has_card = False
         self._placed_card = None
 
         self._use_elemental_rule = is_elemental_rule_in_play
-        self._use_same_wall_rule = is_same_wall_rule_in_play
         self._has_element = False
         self._element = Element.NONE
+        self._elemental_modifiers = ELEMENTAL_MODIFIERS[Element.NONE]
         self._get_element_for_grid()
 
-        self._grid_coordinates = (coordinates[0], coordinates[1])
+        # Copies of a space share its coordinates tuple
+        self._grid_coordinates = tuple(coordinates)
+        self._bit = bit
         self.owner = None
 
-        self._neighbors_coordinates = self._calculate_neighbors(coordinates)
+        # Shared with every space at these coordinates on boards of the same shape
+        self._neighbors_coordinates = neighbors_coordinates or {}
         self.neighbors = {}
 
     def __deepcopy__(self, memo_dict={}):
         if self._grid_coordinates in memo_dict:
             return memo_dict[self._grid_coordinates]
 
-        copy_space = GameBoardLocation(self._grid_coordinates, self._use_elemental_rule)
+        # Copies keep the element already drawn for the space rather than drawing another
+        copy_space = GameBoardLocation(self._grid_coordinates, neighbors_coordinates=self._neighbors_coordinates,
+                                       bit=self._bit)
+        copy_space._use_elemental_rule = self._use_elemental_rule
         copy_space._has_card = self._has_card
         copy_space._placed_card = self._placed_card
         copy_space._has_element = self._has_element
         copy_space._element = self._element
+        copy_space._elemental_modifiers = self._elemental_modifiers
         copy_space.owner = self.owner
-        copy_space._neighbors_coordinates = self._neighbors_coordinates
         memo_dict[self._grid_coordinates] = copy_space
 
         return copy_space
@@ -163,6 +280,10 @@ class GameBoardLocation:
     def has_card(self):
         return self._has_card
 
+    @property
+    def bit(self):
+        return self._bit
+
     @property
     def placed_card(self):
         return self._placed_card
@@ -175,23 +296,26 @@ class GameBoardLocation:
     def element(self):
         return self._element
 
+    @property
+    def elemental_modifiers(self):
+        return self._elemental_modifiers
+
     def place_card(self, agent, card):
         self._has_card = True
         self._placed_card = card
         self.owner = agent
 
+    def remove_card(self):
+        self._has_card = False
+        self._placed_card = None
+        self.owner = None
+
     def set_owner(self, agent):
         self.owner = agent
 
     def calculate_location_value(self, rank_direction):
         if self._has_card:
-            elemental_addend = 0
-            if self._use_elemental_rule:
-                if self.has_elemental_agreement():
-                    elemental_addend = 1
-                elif self.has_elemental_conflict():
-                    elemental_addend = -1
-            return self._placed_card.get_rank(rank_direction) + elemental_addend
+            return self._placed_card.get_rank(rank_direction) + self._elemental_modifiers[self._placed_card.element]
         return -1
 
     def get_location_rank(self, rank_direction):
@@ -218,25 +342,25 @@ class GameBoardLocation:
     def can_flip(self, neighbor, direction):
         if self is neighbor:
             return False
-        opposite_direction = direction.get_opposite()
+        opposite_direction = OPPOSITE_DIRECTIONS[direction]
         return self.calculate_location_value(direction) > neighbor.calculate_location_value(opposite_direction)
 
     def is_equal(self, neighbor, direction):
         if self is neighbor:
             return False
-        opposite_direction = direction.get_opposite()
+        opposite_direction = OPPOSITE_DIRECTIONS[direction]
         return self.get_location_rank(direction) == neighbor.get_location_rank(opposite_direction)
 
     def get_sum(self, neighbor, direction):
         if self is neighbor:
             return False
-        opposite_direction = direction.get_opposite()
+        opposite_direction = OPPOSITE_DIRECTIONS[direction]
         return self.get_location_rank(direction) + neighbor.get_location_rank(opposite_direction)
 
     def is_greater(self, neighbor, direction):
         if self is neighbor:
             return False
-        opposite_direction = direction.get_opposite()
+        opposite_direction = OPPOSITE_DIRECTIONS[direction]
         return self.get_location_rank(direction) > neighbor.get_location_rank(opposite_direction)
 
     def _get_element_for_grid(self):
@@ -249,63 +373,66 @@ class GameBoardLocation:
                 self._element = Element.NONE
         else:
             self._element = Element.NONE
+        self._elemental_modifiers = ELEMENTAL_MODIFIERS[self._element]
 
-    def _calculate_neighbors(self, coordinates):
-        neighbors = {}
-        x, y = coordinates
-        if self._use_same_wall_rule:
-            # Walls will be included as "neighbors"
-            neighbors[Direction.LEFT] = (x - 1, y)
-            neighbors[Direction.RIGHT] = (x + 1, y)
-            neighbors[Direction.TOP] = (x, y - 1)
-            neighbors[Direction.BOTTOM] = (x, y + 1)
-        else:
-            if x > 0:
-                neighbors[Direction.LEFT] = (x - 1, y)
-            if x < constants.GAME_GRID_WIDTH - 1:
-                neighbors[Direction.RIGHT] = (x + 1, y)
-            if y > 0:
-                neighbors[Direction.TOP] = (x, y - 1)
-            if y < constants.GAME_GRID_HEIGHT - 1:
-                neighbors[Direction.BOTTOM] = (x, y + 1)
-        return neighbors
+
+# Every edge of every grid under Same Wall neighbors this one space. It holds the wall card,
+# has no owner and is never flipped, so it is shared by every board and every copy.
+WALL_LOCATION = GameBoardLocation((-1, -1))
+WALL_LOCATION.place_card(None, WALL_CARD)
 
 
 class Grid:
 
     """ Class to handle the actual game board grid logic for GameBoardPlaces.
 
+    Free spaces are kept in a bitmask with a bit for each space, numbered y * width + x,
+    which is updated as cards are placed and removed instead of scanning the grid.
+    Neighbor links come from the shared Topology for the board's shape.
+
     Attributes:
         rules (Rules): The rules of the game
+        events (EventBus): Receives placement, rule and flip events, or None for silent boards such as copies
+
+    Methods:
+        is_free: Returns true if the given coordinates are a free space on the grid
+        iter_free_spaces: Yields the coordinates of each free space
+        get_free_spaces_dict: Returns a dict of free coordinates to their GameBoardLocation
     """
 
-    def __init__(self, rules):
-        self._width = constants.GAME_GRID_WIDTH
-        self._height = constants.GAME_GRID_HEIGHT
+    __slots__ = ('_width', '_height', '_count_free_spaces', '_free_spaces', 'rules', 'events', '_topology', 'data')
+
+    def __init__(self, rules, width=constants.GAME_GRID_WIDTH, height=constants.GAME_GRID_HEIGHT):
+        self._width = width
+        self._height = height
         self._count_free_spaces = 0
+        self._free_spaces = 0
         self.rules = rules
+        self.events = None
+        self._topology = get_topology(width, height, rules.is_same_wall)
 
         # Create a GameBoardLocation object for each space in the grid
         # Pass the game board specific rules needed
         self.data = [
             [GameBoardLocation((x, y),
                                is_elemental_rule_in_play=rules.is_elemental,
-                               is_same_wall_rule_in_play=rules.is_same_wall) for x in range(self._width)]
-            for y in range(self._height)]
-
-        # Link GameBoardLocations now that they're initialized
-        for x in range(self._width):
-            for y in range(self._height):
-                for key, value in self[(x, y)].neighbors_coordinates.items():
-                    if value[0] not in range(self._width) or value[1] not in range(self._height):
-                        # This is a wall
-                        self[(x, y)].neighbors[key] = GameBoardLocation(value)
-                        self[(x, y)].neighbors[key].place_card(None, Cards.wall_card)
-                    else:
-                        self[(x, y)].neighbors[key] = self[value]
+                               neighbors_coordinates=self._topology.neighbor_coordinates[y * width + x],
+                               bit=1 << (y * width + x)) for x in range(width)]
+            for y in range(height)]
+        self._link_neighbors()
 
         self.initialize()
 
+    def _link_neighbors(self):
+        # Link GameBoardLocations now that they're initialized
+        for cell, neighbor_cells in enumerate(self._topology.neighbor_cells):
+            location = self.data[cell // self._width][cell % self._width]
+            for direction, neighbor_cell in neighbor_cells:
+                if neighbor_cell == WALL:
+                    location.neighbors[direction] = WALL_LOCATION
+                else:
+                    location.neighbors[direction] = self.data[neighbor_cell // self._width][neighbor_cell % self._width]
+
     @property
     def width(self):
         return self._width
@@ -318,6 +445,10 @@ class Grid:
     def count_free_spaces(self):
         return self._count_free_spaces
 
+    @property
+    def free_spaces(self):
+        return self._free_spaces
+
     def get_row(self, row_index):
         if 0 <= row_index < self._height:
             return self.data[row_index]
@@ -328,20 +459,19 @@ class Grid:
         return self.data[y][x]
 
     def __deepcopy__(self, memo_dict={}):
-        copy_grid = Grid(self.rules)
+        # The copy takes its spaces from this grid, so none are built for it first
+        copy_grid = Grid.__new__(Grid)
+        copy_grid._width = self._width
+        copy_grid._height = self._height
         copy_grid._count_free_spaces = self._count_free_spaces
+        copy_grid._free_spaces = self._free_spaces
+        copy_grid.rules = self.rules
+        copy_grid.events = None
+        copy_grid._topology = self._topology
         copy_grid.data = [[copy.deepcopy(self[(x, y)]) for x in range(self._width)] for y in range(self._height)]
 
         # Map copied neighbors to each other
-        for x in range(copy_grid._width):
-            for y in range(copy_grid._height):
-                for key, value in copy_grid[(x, y)].neighbors_coordinates.items():
-                    if value[0] not in range(self._width) or value[1] not in range(self._height):
-                        # This is a wall
-                        copy_grid[(x, y)].neighbors[key] = GameBoardLocation(value)
-                        copy_grid[(x, y)].neighbors[key].place_card(None, Cards.wall_card)
-                    else:
-                        copy_grid[(x, y)].neighbors[key] = copy_grid[value]
+        copy_grid._link_neighbors()
 
         return copy_grid
 
@@ -351,22 +481,57 @@ class Grid:
                 if self[(x, y)].owner is not None:
                     self[(x, y)].set_owner(copied_agents[self[(x, y)].owner.index])
 
+    def is_free(self, coordinates):
+        x, y = coordinates
+        if not (0 <= x < self._width and 0 <= y < self._height):
+            return False
+        return bool(self._free_spaces >> (y * self._width + x) & 1)
+
+    def iter_free_spaces(self):
+        free_spaces = self._free_spaces
+        for bit, coordinates in self._topology.space_bits:
+            if free_spaces & bit:
+                yield coordinates
+
     def get_free_spaces_dict(self):
-        free_spaces = {}
-        for x in range(self._width):
-            for y in range(self._height):
-                if self[(x, y)] is not None and not self[(x, y)].has_card:
-                    free_spaces[(x, y)] = (self[(x, y)])
-        return free_spaces
+        return {coordinates: self[coordinates] for coordinates in self.iter_free_spaces()}
 
     def place_card(self, agent, card, coordinates):
-        if not self[coordinates].has_card:
-            self[coordinates].place_card(agent, card)
-            self._count_free_spaces -= 1
+        return self.apply_move(agent, card, coordinates) is not None
+
+    def apply_move(self, agent, card, coordinates):
+        """ Places a card and resolves flips in place.
+            Returns a token recording the placed space and the ownership flips for undo_move,
+            or None if the space already has a card.
+        """
+        x, y = coordinates
+        bit = 1 << (y * self._width + x)
+        if not self._free_spaces & bit:
+            return None
+
+        location = self[coordinates]
+        location.place_card(agent, card)
+        self._free_spaces ^= bit
+        self._count_free_spaces -= 1
+        if self.events is not None and self.events.wants(PlacementEvent):
+            self.events.publish(PlacementEvent(agent, card, coordinates))
+
+        flips = self.rules.handle_card_placement(location, self.events)
+        return location, flips, bit
+
+    def undo_move(self, token):
+        location, flips, bit = token
+        challenger_owner = location.owner
 
-            self.rules.handle_card_placement(self[coordinates])
-            return True
-        return False
+        # Revert flips in reverse order, restoring owners and score deltas
+        for neighbor, previous_owner in reversed(flips):
+            challenger_owner.decrement_score()
+            neighbor.set_owner(previous_owner)
+            previous_owner.increment_score()
+
+        location.remove_card()
+        self._free_spaces |= bit
+        self._count_free_spaces += 1
 
     def initialize(self):
         for x in range(self._width):
@@ -378,6 +543,7 @@ class Grid:
                     self[(x, y)].initialize()
 
         self._count_free_spaces = self._width * self._height
+        self._free_spaces = (1 << self._count_free_spaces) - 1
 
 
 class Game:
@@ -388,25 +554,40 @@ class Game:
         agents (List[Agent]): The players of the game
         display (Display): The Display class to show game status
         rules (Rules): The rules the game should use
+        width (int): The width of the game board
+        height (int): The height of the game board
+        cards_in_hand (int): The number of cards dealt to each player, one more than half the board
+        events (EventBus): Publishes game events to the display and any other subscribers
 
     Methods:
         initialize: Handles initializing a Game instance for playing
         increment_agent_turn: Changes index indicating which Agent's turn it is
         calculate_winner: Compares Agent's scores and determines the winner
-        run: Handles the actual game loop
+        run: Handles the actual game loop, closing the agents when it ends
     """
 
-    def __init__(self, agents, display, rules):
+    def __init__(self, agents, display, rules, width=constants.GAME_GRID_WIDTH, height=constants.GAME_GRID_HEIGHT):
+        if width * height > constants.MAXIMUM_GRID_SPACES:
+            raise ValueError('Boards of more than {} spaces are not supported'.format(constants.MAXIMUM_GRID_SPACES))
         self.is_game_over = False
         # This class will maintain all of the cards
         self.cards_handler = Cards()
         self.display = display
         self.rules = rules
+        # The first player places the last card, so both players always hold a card to play
+        self.cards_in_hand = width * height // 2 + 1
 
-        self.game_state = GameState(agents, rules)
+        self.game_state = GameState(agents, rules, width, height)
         self.game_board = self.game_state.get_game_board()
         self.agents = agents
 
+        # Only the board in play publishes events; copies made for search stay silent
+        self.events = EventBus()
+        self.game_board.events = self.events
+        for agent in agents:
+            agent.events = self.events
+        self.display.subscribe(self.events)
+
     def initialize(self):
         self.is_game_over = False
         self.game_state.initialize()
@@ -427,9 +608,17 @@ class Game:
             # Player's turn
             current_player = self.game_state.get_current_player()
             self.display.display_game_state(self.game_state)
-            legal_cards, legal_grid_spaces = self.game_state.get_legal_agent_actions(current_player)
-            card_index, coordinates = current_player.get_action(self.game_state)
-            self.game_board.place_card(current_player, current_player.play_card(legal_cards[card_index]), coordinates)
+            # The other players may think ahead while the current player decides
+            waiting_agents = [agent for agent in self.agents if agent is not current_player]
+            for agent in waiting_agents:
+                agent.start_pondering(self.game_state)
+            try:
+                card_index, coordinates = current_player.get_action(self.game_state)
+            finally:
+                for agent in waiting_agents:
+                    agent.stop_pondering()
+            card = current_player.hand[card_index]
+            self.game_board.place_card(current_player, current_player.play_card(card), coordinates)
 
             self.is_game_over = self.game_board.count_free_spaces == 0
             self.increment_agent_turn()
@@ -438,23 +627,28 @@ class Game:
         """Start the game"""
 
         # Deal the cards
-        hands = self.cards_handler.deal_cards()
+        hands = self.cards_handler.deal_cards(self.cards_in_hand)
         for i in range(constants.NUMBER_OF_PLAYERS):
             self.agents[i].set_hand(hands[i])
 
-        while True:
-            self.main_loop()
+        try:
+            while True:
+                self.main_loop()
 
-            if self.rules.is_sudden_death and self.calculate_winner() is None:
-                # Sudden death is in effect; prepare for next round
-                self.game_board.initialize()
-                self.is_game_over = False
+                if self.rules.is_sudden_death and self.calculate_winner() is None:
+                    # Sudden death is in effect; prepare for next round
+                    self.game_board.initialize()
+                    self.is_game_over = False
 
-            # TODO Tell display sudden death has occurred
-                print("SUDDEN DEATH IN PLAY")
+                    if self.events.wants(SuddenDeathEvent):
+                        self.events.publish(SuddenDeathEvent())
 
-            else:
-                break
+                else:
+                    break
+        finally:
+            # Agents release their pondering threads and worker processes once the game is over
+            for agent in self.agents:
+                agent.close()
 
         self.game_state.winner = self.calculate_winner()
         self.display.display_end_game(self.game_state)
@@ -0,0 +1,483 @@
+from array import array
+# The cards module creates the standard cards when it loads, before their tables are registered below
+import cards
+from collections import deque, namedtuple
+from components import Card, Element
+import constants
+from topology import DIRECTIONS, WALL, get_topology
+
+import random
+
+
+WALL_RANK = 10
+
+EMPTY = -1
+
+# Card data shared by every packed state, indexed by Card.card_id
+_card_elements = []
+_card_element_values = array('b')
+RANKS = array('b')
+
+# Elemental modifier tables hold an entry for each element value per cell
+ELEMENT_SLOTS = len(Element) + 1
+
+# The rule flags a packed state needs, standing in for Rules when a state is deserialized
+PackedRules = namedtuple('PackedRules', ['is_elemental', 'is_same', 'is_same_wall', 'is_plus', 'is_combo'])
+
+# Zobrist keys, drawn from a fixed seed so every process hashes positions alike.
+# Placement keys are indexed by cell, so they would overlap on boards of more cells.
+MAX_CELLS = constants.MAXIMUM_GRID_SPACES
+MAX_COPIES_IN_HAND = 16
+_zobrist_random = random.Random(0x7219AD)
+_placement_keys = []
+_flip_keys = []
+_hand_keys = []
+_side_keys = [_zobrist_random.getrandbits(64) for _ in range(constants.NUMBER_OF_PLAYERS)]
+_rule_keys = [_zobrist_random.getrandbits(64) for _ in range(4)]
+_element_keys = [_zobrist_random.getrandbits(64) for _ in range(MAX_CELLS * (len(Element) + 1))]
+
+
+# Flags of get_placement_outcomes for the capture rules a placement triggers
+TRIGGERED_SAME = 1
+TRIGGERED_PLUS = 2
+
+
+def get_card_id(card):
+    """Returns the card's id, extending the card tables to cover it on first use"""
+    card_id = card.card_id
+    if card_id >= len(_card_elements):
+        _register_cards()
+    return card_id
+
+
+def _register_cards():
+    # Tables grow in card id order, so the Zobrist keys drawn for a card depend only on its id
+    for card_id in range(len(_card_elements), Card.count_cards()):
+        card = Card.get_by_id(card_id)
+        _card_elements.append(card.element)
+        _card_element_values.append(card.element.value)
+        RANKS.extend(card.get_rank(direction) for direction in DIRECTIONS)
+        _add_zobrist_keys()
+
+
+def _add_zobrist_keys():
+    # Placement keys are indexed by (card_id * MAX_CELLS + cell) * 2 + owner
+    for _ in range(MAX_CELLS):
+        owner_keys = (_zobrist_random.getrandbits(64), _zobrist_random.getrandbits(64))
+        _placement_keys.extend(owner_keys)
+        _flip_keys.append(owner_keys[0] ^ owner_keys[1])
+    # Hand keys are indexed by (card_id * NUMBER_OF_PLAYERS + player) * MAX_COPIES_IN_HAND + copy
+    _hand_keys.extend(_zobrist_random.getrandbits(64)
+                      for _ in range(constants.NUMBER_OF_PLAYERS * MAX_COPIES_IN_HAND))
+
+
+def _get_hand_key(player, card_id, copy_index):
+    return _hand_keys[(card_id * constants.NUMBER_OF_PLAYERS + player) * MAX_COPIES_IN_HAND + copy_index]
+
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+# The standard cards are created when the cards module loads, so their ids match in every process
+_register_cards()
+
+
+class PackedState:
+
+    """ Class to hold a compact copy of a game state for search and simulation.
+
+    Cells hold card ids (EMPTY when free), occupied spaces and owners are kept as
+    bitmasks where an owner bit is set when player index 1 owns the space, and
+    hands hold card ids in the same order as the Agent hands. A Zobrist key over
+    (cell, card, owner), hand contents, active rules and grid elements is kept
+    up to date as moves are made and unmade.
+
+    Attributes:
+        rules (Rules): The rules of the game
+        width (int): The width of the grid
+        height (int): The height of the grid
+        cell_elements (List[Element]): The element of each grid space
+
+    Methods:
+        from_game_state: Returns a PackedState copied from a GameState
+        copy: Returns an independent copy of the packed state
+        serialize: Returns the state as a tuple of plain values, cheap to pickle
+        deserialize: Returns a PackedState rebuilt from serialize output
+        get_cell: Returns the cell index for grid coordinates
+        get_coordinates: Returns the grid coordinates for a cell index
+        get_free_cells: Returns a list of free cell indexes
+        get_legal_actions: Returns a list of (card_index, cell) pairs for a player, optionally only
+            for the first copy of each card in hand
+        get_count_turns_remaining: Returns the int count of free cells
+        is_terminal: Returns true if every cell has a card
+        get_owner: Returns the index of the player owning a cell, or None if it is free
+        get_key: Returns the Zobrist key of the position with a given player to move
+        placement_flips: Returns the bitmask of opposing cells flipped if a player placed a card in a free cell,
+            without placing it, following Rules.handle_card_placement. Set at construction to the
+            resolver for the active rules
+        get_placement_outcomes: Returns the flips of every card in a player's hand in every free cell by the rule
+            that made them, and the rules each placement triggers, in one pass without placing anything
+        apply_move: Places a card from a player's hand and returns a token for undo_move
+        undo_move: Reverts a move made with apply_move using its token
+    """
+
+    def __init__(self, rules, width=constants.GAME_GRID_WIDTH, height=constants.GAME_GRID_HEIGHT,
+                 cell_elements=None, elemental_modifiers=None):
+        if width * height > MAX_CELLS:
+            raise ValueError('Boards of more than {} spaces are not supported'.format(MAX_CELLS))
+        self.rules = rules
+        self.width = width
+        self.height = height
+        self.cell_count = width * height
+        self.full_mask = (1 << self.cell_count) - 1
+
+        self.cells = array('h', [EMPTY] * self.cell_count)
+        self.occupied = 0
+        self.owners = 0
+        self.hands = [[] for _ in range(constants.NUMBER_OF_PLAYERS)]
+        self.scores = [0] * constants.NUMBER_OF_PLAYERS
+        self.cell_elements = list(cell_elements or [Element.NONE] * self.cell_count)
+        # Copies share the table, since the elements are fixed for the game
+        self._elemental_modifiers = elemental_modifiers or self._build_elemental_modifiers()
+
+        self._is_elemental = rules.is_elemental
+        self._is_same = rules.is_same
+        self._is_plus = rules.is_plus
+        self._is_combo = rules.is_combo
+        topology = get_topology(width, height, rules.is_same_wall)
+        self._adjacent = topology.adjacency
+        self._sides = topology.sides
+
+        # Pick the resolver once, so placements don't re-check which rules are active
+        if self._is_same or self._is_plus:
+            self.placement_flips = self._capture_flips
+        elif self._is_elemental:
+            self.placement_flips = self._elemental_flips
+        else:
+            self.placement_flips = self._basic_flips
+
+        self._base_key = self._compute_base_key()
+        self.key = self._base_key
+
+    @classmethod
+    def from_game_state(cls, game_state):
+        board = game_state.get_game_board()
+        cell_elements = [board[(x, y)].element for y in range(board.height) for x in range(board.width)]
+        state = cls(game_state.rules, board.width, board.height, cell_elements)
+
+        for y in range(board.height):
+            for x in range(board.width):
+                location = board[(x, y)]
+                if location.has_card:
+                    cell = y * board.width + x
+                    state.cells[cell] = get_card_id(location.placed_card)
+                    state.occupied |= 1 << cell
+                    if location.owner.index:
+                        state.owners |= 1 << cell
+
+        for agent in game_state.get_agents():
+            state.hands[agent.index] = [get_card_id(card) for card in agent.hand]
+            state.scores[agent.index] = agent.score
+
+        state.key = state._compute_key()
+        return state
+
+    def copy(self):
+        state_copy = PackedState(self.rules, self.width, self.height, self.cell_elements, self._elemental_modifiers)
+        state_copy.cells = array('h', self.cells)
+        state_copy.occupied = self.occupied
+        state_copy.owners = self.owners
+        state_copy.hands = [list(hand) for hand in self.hands]
+        state_copy.scores = list(self.scores)
+        state_copy.key = self.key
+        return state_copy
+
+    def serialize(self):
+        """ Card ids are only meaningful to processes sharing the registry, which holds
+            for every standard card since those are registered when the module loads.
+        """
+        rules = self.rules
+        rule_flags = (rules.is_elemental, rules.is_same, rules.is_same_wall, rules.is_plus, rules.is_combo)
+        return (self.width, self.height, rule_flags, tuple(element.value for element in self.cell_elements),
+                self.cells.tobytes(), self.occupied, self.owners,
+                tuple(tuple(hand) for hand in self.hands), tuple(self.scores), self.key)
+
+    @classmethod
+    def deserialize(cls, data):
+        width, height, rule_flags, element_values, cells, occupied, owners, hands, scores, key = data
+        state = cls(PackedRules(*rule_flags), width, height, [Element(value) for value in element_values])
+        state.cells = array('h')
+        state.cells.frombytes(cells)
+        state.occupied = occupied
+        state.owners = owners
+        state.hands = [list(hand) for hand in hands]
+        state.scores = list(scores)
+        state.key = key
+        return state
+
+    def _compute_base_key(self):
+        key = 0
+        rule_flags = (self._is_elemental, self._is_same, self.rules.is_same_wall, self._is_plus)
+        for rule_key, is_active in zip(_rule_keys, rule_flags):
+            if is_active:
+                key ^= rule_key
+        for cell, element in enumerate(self.cell_elements):
+            if element is not Element.NONE:
+                key ^= _element_keys[cell * (len(Element) + 1) + element.value]
+        return key
+
+    def _compute_key(self):
+        key = self._base_key
+        for cell in range(self.cell_count):
+            if self.occupied >> cell & 1:
+                key ^= _placement_keys[(self.cells[cell] * MAX_CELLS + cell) * 2 + (self.owners >> cell & 1)]
+        for player, hand in enumerate(self.hands):
+            for copy_index, card_id in enumerate(hand):
+                key ^= _get_hand_key(player, card_id, hand[:copy_index].count(card_id))
+        return key
+
+    def get_key(self, player):
+        return self.key ^ _side_keys[player]
+
+    def get_cell(self, coordinates):
+        x, y = coordinates
+        return y * self.width + x
+
+    def get_coordinates(self, cell):
+        return cell % self.width, cell // self.width
+
+    def get_free_cells(self):
+        free = ~self.occupied & self.full_mask
+        return [cell for cell in range(self.cell_count) if free >> cell & 1]
+
+    def get_legal_actions(self, player, distinct=False):
+        free_cells = self.get_free_cells()
+        hand = self.hands[player]
+        card_indexes = range(len(hand))
+        if distinct:
+            # Playing either copy of a card leads to the same position
+            card_indexes = [card_index for card_index, card_id in enumerate(hand) if hand.index(card_id) == card_index]
+        return [(card_index, cell) for card_index in card_indexes for cell in free_cells]
+
+    def get_count_turns_remaining(self):
+        return self.cell_count - popcount(self.occupied)
+
+    def is_terminal(self):
+        return self.occupied == self.full_mask
+
+    def get_owner(self, cell):
+        if self.occupied >> cell & 1:
+            return self.owners >> cell & 1
+        return None
+
+    def _build_elemental_modifiers(self):
+        # Entry cell * ELEMENT_SLOTS + card element value is the rank modifier for a card in the cell
+        table = array('b', [0] * (self.cell_count * ELEMENT_SLOTS))
+        for cell, cell_element in enumerate(self.cell_elements):
+            if cell_element is not Element.NONE:
+                for card_element in Element:
+                    table[cell * ELEMENT_SLOTS + card_element.value] = 1 if card_element is cell_element else -1
+        return table
+
+    def _basic_flips(self, cell, card_id, player):
+        cells = self.cells
+        ranks = RANKS
+        opponents = (self.owners if player == 0 else ~self.owners) & self.occupied
+        card_base = card_id * 4
+
+        flipped = 0
+        for direction, neighbor in self._adjacent[cell]:
+            if opponents >> neighbor & 1 and \
+                    ranks[card_base + direction] > ranks[cells[neighbor] * 4 + (direction ^ 2)]:
+                flipped |= 1 << neighbor
+        return flipped
+
+    def _elemental_flips(self, cell, card_id, player):
+        cells = self.cells
+        ranks = RANKS
+        opponents = (self.owners if player == 0 else ~self.owners) & self.occupied
+        card_base = card_id * 4
+        modifiers = self._elemental_modifiers
+        element_values = _card_element_values
+        modifier = modifiers[cell * ELEMENT_SLOTS + element_values[card_id]]
+
+        flipped = 0
+        for direction, neighbor in self._adjacent[cell]:
+            if opponents >> neighbor & 1:
+                neighbor_card_id = cells[neighbor]
+                neighbor_rank = ranks[neighbor_card_id * 4 + (direction ^ 2)] + \
+                    modifiers[neighbor * ELEMENT_SLOTS + element_values[neighbor_card_id]]
+                if ranks[card_base + direction] + modifier > neighbor_rank:
+                    flipped |= 1 << neighbor
+        return flipped
+
+    def _get_neighbors_with_cards(self, cell, opponents):
+        """ Returns the neighbors of a cell holding a card or a wall as (direction, neighbor cell or WALL, adjoining
+            neighbor rank), and whether any of them holds an opposing card
+        """
+        cells = self.cells
+        ranks = RANKS
+        occupied = self.occupied
+
+        has_opposing_neighbor = False
+        neighbors_with_cards = []
+        for direction, neighbor in self._sides[cell]:
+            if neighbor == WALL:
+                neighbors_with_cards.append((direction, WALL, WALL_RANK))
+            elif occupied >> neighbor & 1:
+                neighbors_with_cards.append((direction, neighbor, ranks[cells[neighbor] * 4 + (direction ^ 2)]))
+                if opponents >> neighbor & 1:
+                    has_opposing_neighbor = True
+        return neighbors_with_cards, has_opposing_neighbor
+
+    def _resolve_placement(self, cell, card_id, neighbors_with_cards, opponents):
+        """ Returns (flipped, same, plus, combo, triggered) for a card placed in a cell next to an opposing card.
+            same, plus and combo are the bitmasks of the cells those rules capture, own cards included, and
+            triggered holds TRIGGERED_SAME and TRIGGERED_PLUS for the rules that trigger. A rule triggers as Rules
+            announces it, even when its cards are already the player's own or, for Same, walls, since those cards
+            still start a Combo.
+        """
+        cells = self.cells
+        ranks = RANKS
+        card_base = card_id * 4
+        triggered = 0
+
+        same_sources = []
+        if self._is_same and len(neighbors_with_cards) > 1:
+            same_neighbors = [neighbor for direction, neighbor, rank in neighbors_with_cards
+                              if ranks[card_base + direction] == rank]
+            if len(same_neighbors) >= 2:
+                triggered = TRIGGERED_SAME
+                # Walls count toward Same but are never flipped
+                same_sources = [neighbor for neighbor in same_neighbors if neighbor >= 0]
+
+        plus_sources = []
+        if self._is_plus:
+            plus_neighbors = [(ranks[card_base + direction] + rank, neighbor)
+                              for direction, neighbor, rank in neighbors_with_cards if neighbor >= 0]
+            plus_values = [plus_value for plus_value, _ in plus_neighbors]
+            plus_sources = [neighbor for plus_value, neighbor in plus_neighbors if plus_values.count(plus_value) >= 2]
+            if plus_sources:
+                triggered |= TRIGGERED_PLUS
+
+        same = plus = combo = 0
+        if triggered:
+            for neighbor in same_sources:
+                same |= 1 << neighbor
+            for neighbor in plus_sources:
+                plus |= 1 << neighbor
+
+            # Combo cascades breadth first: flipped cards flip opposing neighbors with smaller
+            # adjoining ranks, which flip their own neighbors in turn. Each cell is expanded once.
+            adjacent = self._adjacent
+            captured = same | plus
+            visited = 0
+            worklist = deque(same_sources + plus_sources)
+            while worklist:
+                source = worklist.popleft()
+                if visited >> source & 1:
+                    continue
+                visited |= 1 << source
+
+                source_base = cells[source] * 4
+                for direction, neighbor in adjacent[source]:
+                    neighbor_bit = 1 << neighbor
+                    if opponents & neighbor_bit and not (captured | combo) & neighbor_bit and \
+                            ranks[source_base + direction] > ranks[cells[neighbor] * 4 + (direction ^ 2)]:
+                        combo |= neighbor_bit
+                        worklist.append(neighbor)
+
+        # Standard flip rules
+        # Without the elemental rule every cell is Element.NONE and the modifiers are 0
+        modifiers = self._elemental_modifiers
+        element_values = _card_element_values
+        modifier = modifiers[cell * ELEMENT_SLOTS + element_values[card_id]]
+        basic = 0
+        for direction, neighbor, rank in neighbors_with_cards:
+            if neighbor >= 0 and opponents >> neighbor & 1:
+                if ranks[card_base + direction] + modifier > \
+                        rank + modifiers[neighbor * ELEMENT_SLOTS + element_values[cells[neighbor]]]:
+                    basic |= 1 << neighbor
+
+        return (same | plus | combo | basic) & opponents, same, plus, combo, triggered
+
+    def _capture_flips(self, cell, card_id, player):
+        opponents = (self.owners if player == 0 else ~self.owners) & self.occupied
+        neighbors_with_cards, has_opposing_neighbor = self._get_neighbors_with_cards(cell, opponents)
+        # Every rule needs an opposing neighbor to flip anything
+        if not has_opposing_neighbor:
+            return 0
+        return self._resolve_placement(cell, card_id, neighbors_with_cards, opponents)[0]
+
+    def get_placement_outcomes(self, player):
+        """ Returns (card_index, cell, flipped, same, plus, combo, triggered) for the first copy of each card in a
+            player's hand and each free cell. flipped is the bitmask placement_flips returns; same, plus and combo
+            are the bitmasks of cells flipped by those rules, and cells in none of them were flipped by the basic
+            rule. triggered holds TRIGGERED_SAME and TRIGGERED_PLUS for the rules the placement triggers, which
+            may flip nothing when the matching cards are the player's own or walls.
+            Placements are resolved as in placement_flips, looking up the neighbors of each free cell once
+            for every card.
+        """
+        hand = self.hands[player]
+        opponents = (self.owners if player == 0 else ~self.owners) & self.occupied
+        card_indexes = [card_index for card_index, card_id in enumerate(hand) if hand.index(card_id) == card_index]
+
+        outcomes = []
+        for cell in self.get_free_cells():
+            neighbors_with_cards, has_opposing_neighbor = self._get_neighbors_with_cards(cell, opponents)
+            for card_index in card_indexes:
+                if not has_opposing_neighbor:
+                    outcomes.append((card_index, cell, 0, 0, 0, 0, 0))
+                    continue
+                flipped, same, plus, combo, triggered = \
+                    self._resolve_placement(cell, hand[card_index], neighbors_with_cards, opponents)
+                outcomes.append((card_index, cell, flipped, same & opponents, plus & opponents, combo, triggered))
+        return outcomes
+
+    def apply_move(self, player, card_index, cell, flipped=None):
+        """ Places a card from a player's hand in a free cell and resolves flips.
+            The flipped bitmask may be passed in when placement_flips was already called for the move.
+        """
+        hand = self.hands[player]
+        card_id = hand.pop(card_index)
+        if flipped is None:
+            flipped = self.placement_flips(cell, card_id, player)
+
+        # The copy removed from the hand is the last of its kind in the key
+        previous_key = self.key
+        key = previous_key ^ _get_hand_key(player, card_id, hand.count(card_id))
+        key ^= _placement_keys[(card_id * MAX_CELLS + cell) * 2 + player]
+        flipped_cells = flipped
+        while flipped_cells:
+            lowest_bit = flipped_cells & -flipped_cells
+            flipped_cell = lowest_bit.bit_length() - 1
+            key ^= _flip_keys[self.cells[flipped_cell] * MAX_CELLS + flipped_cell]
+            flipped_cells ^= lowest_bit
+        self.key = key
+
+        self.cells[cell] = card_id
+        self.occupied |= 1 << cell
+        # Flipped cells belonged to the opponent, so toggling their bits hands them to the player
+        self.owners ^= flipped
+        if player:
+            self.owners |= 1 << cell
+
+        count_flipped = popcount(flipped)
+        self.scores[player] += count_flipped
+        self.scores[1 - player] -= count_flipped
+
+        return player, card_index, cell, flipped, count_flipped, previous_key
+
+    def undo_move(self, token):
+        player, card_index, cell, flipped, count_flipped, previous_key = token
+        self.key = previous_key
+
+        self.scores[player] -= count_flipped
+        self.scores[1 - player] += count_flipped
+
+        self.owners ^= flipped
+        self.owners &= ~(1 << cell)
+        self.occupied &= ~(1 << cell)
+        self.hands[player].insert(card_index, self.cells[cell])
+        self.cells[cell] = EMPTY
@@ -0,0 +1,234 @@
+from agents import FirstAvailableAgent, MinMaxAgent, MonteCarloAgent, RandomAgent
+from evaluation import EVALUATIONS
+from game import Game
+from textdisplay import NullGraphics
+from triple_triad import Rules
+import constants
+
+from concurrent.futures import ProcessPoolExecutor
+import random
+import sys
+import time
+
+
+AGENT_TYPES = {
+    'first': FirstAvailableAgent,
+    'random': RandomAgent,
+    'minmax': MinMaxAgent,
+    'mcts': MonteCarloAgent,
+}
+
+
+class SimulationResults:
+
+    """ Class to aggregate the outcomes of simulated games, counted from the first agent's side
+
+    Attributes:
+        games (int): The number of games played
+        wins (int): Games won by the first agent
+        draws (int): Games drawn
+        losses (int): Games won by the second agent
+        total_scores (List[int]): The sum of final scores for each agent
+        elapsed_seconds (float): Wall clock time spent so far
+
+    Methods:
+        add_game: Records the final scores of one game
+        merge: Adds the counts of another SimulationResults
+        get_average_scores: Returns the average final score for each agent
+        get_games_per_second: Returns the simulation throughput
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.total_scores = [0] * constants.NUMBER_OF_PLAYERS
+        self.elapsed_seconds = 0.0
+
+    def __str__(self):
+        average_scores = self.get_average_scores()
+        return 'games: {} wins: {} draws: {} losses: {} average scores: {:.2f} - {:.2f} games/sec: {:.1f}'.format(
+            self.games, self.wins, self.draws, self.losses,
+            average_scores[0], average_scores[1], self.get_games_per_second())
+
+    def add_game(self, scores):
+        self.games += 1
+        if scores[0] > scores[1]:
+            self.wins += 1
+        elif scores[0] < scores[1]:
+            self.losses += 1
+        else:
+            self.draws += 1
+        for index, score in enumerate(scores):
+            self.total_scores[index] += score
+
+    def merge(self, other):
+        self.games += other.games
+        self.wins += other.wins
+        self.draws += other.draws
+        self.losses += other.losses
+        for index, score in enumerate(other.total_scores):
+            self.total_scores[index] += score
+
+    def get_average_scores(self):
+        if not self.games:
+            return [0.0] * len(self.total_scores)
+        return [score / self.games for score in self.total_scores]
+
+    def get_games_per_second(self):
+        if not self.elapsed_seconds:
+            return 0.0
+        return self.games / self.elapsed_seconds
+
+
+def play_game(agent_names, rules_options, seed, agent_options=None, board_size=None):
+    """Plays one headless game on a (width, height) board and returns the final scores of the agents"""
+    random.seed(seed)
+    agents = [AGENT_TYPES[name](index, **(agent_options or {}).get(name, {}))
+              for index, name in enumerate(agent_names)]
+    width, height = board_size or (constants.GAME_GRID_WIDTH, constants.GAME_GRID_HEIGHT)
+    Game(agents, NullGraphics(), Rules(**rules_options), width, height).run()
+
+    return tuple(agent.score for agent in agents)
+
+
+def play_batch(agent_names, rules_options, first_seed, number_of_games, agent_options=None, board_size=None):
+    """Plays a batch of games with consecutive seeds and returns their SimulationResults"""
+    results = SimulationResults()
+    for seed in range(first_seed, first_seed + number_of_games):
+        results.add_game(play_game(agent_names, rules_options, seed, agent_options, board_size))
+    return results
+
+
+def simulate(number_of_games, agent_names, rules_options, workers=None, batch_size=1000, seed=0, agent_options=None,
+             board_size=None):
+    """ Plays games across a process pool, yielding the aggregated SimulationResults
+        each time a batch finishes.
+    """
+    start_time = time.perf_counter()
+    totals = SimulationResults()
+
+    batch_seeds = range(seed, seed + number_of_games, batch_size)
+    batch_sizes = [min(batch_size, seed + number_of_games - first_seed) for first_seed in batch_seeds]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        batches = executor.map(play_batch,
+                               [agent_names] * len(batch_sizes),
+                               [rules_options] * len(batch_sizes),
+                               batch_seeds,
+                               batch_sizes,
+                               [agent_options] * len(batch_sizes),
+                               [board_size] * len(batch_sizes))
+        for batch_results in batches:
+            totals.merge(batch_results)
+            totals.elapsed_seconds = time.perf_counter() - start_time
+            yield totals
+
+
+def read_command(argv):
+    from optparse import OptionParser
+    usage_str = """
+  USAGE:      python simulate.py <options>
+  EXAMPLES:   (1) python simulate.py -n 10000
+                  - plays 10000 games between random agents with default rules
+              (2) python simulate.py -n 100 --agents minmax,first --move-time-ms 50 --elemental
+                  - plays minmax against first available using the elemental rule
+              (3) python simulate.py -n 1000 --width 5 --height 5
+                  - plays random agents on a 5x5 board
+              (4) python simulate.py -n 100 --agents mcts,minmax --rollouts 500 --depth 3
+                  - plays a 500 rollout mcts agent against a three ply minmax agent
+              (5) python simulate.py -n 100 --agents minmax,minmax --depth 2 --evaluation positional
+                  - plays two ply minmax agents scoring positions with the positional evaluation
+  """
+    parser = OptionParser(usage_str)
+    parser.add_option('-n', '--games', dest='number_of_games', type='int', default=1000,
+                      help='the number of games to play')
+    parser.add_option('-a', '--agents', dest='agents', default='random,random',
+                      help='comma separated agents for each player: ' + ', '.join(sorted(AGENT_TYPES)))
+    parser.add_option('-j', '--workers', dest='workers', type='int',
+                      help='the number of worker processes, defaults to the number of CPUs')
+    parser.add_option('-b', '--batch-size', dest='batch_size', type='int', default=1000,
+                      help='the number of games each worker plays before reporting')
+    parser.add_option('--seed', dest='seed', type='int', default=0,
+                      help='the seed of the first game')
+    parser.add_option('-t', '--move-time-ms', dest='move_time_ms', type='int',
+                      help='the minmax and mcts agents search for at most this many milliseconds per move; '
+                           'without --depth the minmax agent defaults to ' + str(constants.DEFAULT_MOVE_TIME_MS))
+    parser.add_option('--depth', dest='depth', type='int',
+                      help='the maximum number of plies the minmax agent searches')
+    parser.add_option('--persistent-cache', dest='persistent_cache', action='store_true',
+                      help='the minmax agent keeps its search results across turns and rounds')
+    parser.add_option('--symmetry', dest='symmetry', action='store_true',
+                      help='the minmax agent searches rotations and reflections of a position as one')
+    parser.add_option('--evaluation', dest='evaluation', default='score',
+                      help='how the minmax agent scores positions it stops searching at: ' +
+                           ', '.join(sorted(EVALUATIONS)))
+    parser.add_option('-r', '--rollouts', dest='rollouts', type='int',
+                      help='the number of games the mcts agent plays out per move')
+    parser.add_option('--width', dest='width', type='int', default=constants.GAME_GRID_WIDTH,
+                      help='the number of spaces in each row of the board')
+    parser.add_option('--height', dest='height', type='int', default=constants.GAME_GRID_HEIGHT,
+                      help='the number of spaces in each column of the board')
+    parser.add_option('-e', '--elemental', dest='use_elemental_rule', action='store_true',
+                      help='the games will observe the elemental rule')
+    parser.add_option('-s', '--same', dest='use_same_rule', action='store_true',
+                      help='the games will observe the same rule')
+    parser.add_option('-w', '--same-wall', dest='use_same_wall_rule', action='store_true',
+                      help='the games will observe the same wall rule')
+    parser.add_option('-p', '--plus', dest='use_plus_rule', action='store_true',
+                      help='the games will observe the plus rule')
+    parser.add_option('-d', '--sudden-death', dest='use_sudden_death_rule', action='store_true',
+                      help='the games will observe the sudden death rule')
+
+    options, junk = parser.parse_args(argv)
+    if len(junk) != 0:
+        raise Exception('Command line input not understood: ' + str(junk))
+
+    if options.width < 1 or options.height < 1 or options.width * options.height > constants.MAXIMUM_GRID_SPACES:
+        raise Exception('Board size not understood: {}x{}, boards hold at most {} spaces'.format(
+            options.width, options.height, constants.MAXIMUM_GRID_SPACES))
+
+    if options.evaluation not in EVALUATIONS:
+        raise Exception('Evaluation not understood: ' + options.evaluation)
+
+    agent_names = options.agents.split(',')
+    if len(agent_names) != constants.NUMBER_OF_PLAYERS or any(name not in AGENT_TYPES for name in agent_names):
+        raise Exception('Agents not understood: ' + options.agents)
+
+    # Without a depth the minmax agent needs a deadline to finish its moves
+    minmax_move_time_ms = options.move_time_ms
+    if minmax_move_time_ms is None and options.depth is None:
+        minmax_move_time_ms = constants.DEFAULT_MOVE_TIME_MS
+
+    parsed_arguments = dict()
+    parsed_arguments['number_of_games'] = options.number_of_games
+    parsed_arguments['agent_names'] = agent_names
+    parsed_arguments['workers'] = options.workers
+    parsed_arguments['batch_size'] = options.batch_size
+    parsed_arguments['seed'] = options.seed
+    parsed_arguments['board_size'] = (options.width, options.height)
+    parsed_arguments['agent_options'] = {
+        'minmax': {'depth': options.depth, 'move_time_ms': minmax_move_time_ms,
+                   'persistent_cache': options.persistent_cache or False, 'symmetry': options.symmetry or False,
+                   'evaluation': options.evaluation},
+        'mcts': {'iterations': options.rollouts, 'move_time_ms': options.move_time_ms},
+    }
+    parsed_arguments['rules_options'] = {
+        'use_elemental': options.use_elemental_rule or False,
+        'use_same': options.use_same_rule or False,
+        'use_same_wall': options.use_same_wall_rule or False,
+        'use_plus': options.use_plus_rule or False,
+        'use_sudden_death': options.use_sudden_death_rule or False,
+    }
+
+    return parsed_arguments
+
+
+# Entry point for headless batch simulations
+if __name__ == '__main__':
+
+    arguments = read_command(sys.argv[1:])
+
+    for results in simulate(**arguments):
+        print(results)
@@ -0,0 +1,156 @@
+from packed import PackedState, popcount
+from transposition import LRUTranspositionTable, TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+# Game theoretic results for the player to move
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+
+def get_result(score, other_score):
+    if score > other_score:
+        return WIN
+    if score < other_score:
+        return LOSS
+    return DRAW
+
+
+class EndgameSolver:
+
+    """ Class to solve positions exactly with the Open rule, searching to the end of the game.
+
+    Values are only WIN, DRAW or LOSS, so the alpha-beta window is never wider
+    than (LOSS, WIN) and a branch is cut as soon as a result at its bound is found.
+    Copies of a card in hand lead to the same positions, so only the first is searched.
+
+    Every stored value is exact to the end of the game, so a persistent solver keeps its
+    results across solves in an LRUTranspositionTable holding transposition_table_size entries.
+
+    Attributes:
+        transposition_table_size (int): The number of slots in the solver's transposition table
+        persistent (bool): Whether results are kept from one solve to the next
+
+    Methods:
+        solve: Returns the result for the player to move in a GameState and the best (card_index, coordinates)
+        solve_packed: Returns the result for a player to move in a PackedState and the best (card_index, cell)
+        get_stats: Returns a dict of node, duplicate action and transposition counts for the last solve
+    """
+
+    def __init__(self, transposition_table_size=1 << 16, persistent=False):
+        self.persistent = persistent
+        if persistent:
+            self.transposition_table = LRUTranspositionTable(transposition_table_size)
+        else:
+            self.transposition_table = TranspositionTable(transposition_table_size)
+        self.nodes_searched = 0
+        self.duplicate_actions_pruned = 0
+
+    def get_stats(self):
+        return {
+            'nodes': self.nodes_searched,
+            'duplicate_actions_pruned': self.duplicate_actions_pruned,
+            'transposition': self.transposition_table.get_stats(),
+        }
+
+    def solve(self, game_state, agent_index=None):
+        if agent_index is None:
+            agent_index = game_state.get_current_player().index
+
+        packed_state = PackedState.from_game_state(game_state)
+        result, (card_index, cell) = self.solve_packed(packed_state, agent_index)
+        return result, (card_index, packed_state.get_coordinates(cell))
+
+    def solve_packed(self, packed_state, player):
+        self.nodes_searched = 0
+        self.duplicate_actions_pruned = 0
+        if self.persistent:
+            self.transposition_table.new_search()
+        else:
+            self.transposition_table.clear()
+
+        alpha, beta = LOSS - 1, WIN
+        best_result, best_action = LOSS - 1, None
+        actions = packed_state.get_legal_actions(player, distinct=True)
+        self.duplicate_actions_pruned += len(packed_state.get_legal_actions(player)) - len(actions)
+        for card_index, cell in actions:
+            token = packed_state.apply_move(player, card_index, cell)
+            result = -self._solve(packed_state, 1 - player, -beta, -alpha)
+            packed_state.undo_move(token)
+            if result > best_result:
+                best_result, best_action = result, (card_index, cell)
+                alpha = max(alpha, result)
+                if result == WIN:
+                    # Nothing beats a win
+                    break
+
+        return best_result, best_action
+
+    def _solve(self, packed_state, player, alpha, beta):
+        self.nodes_searched += 1
+
+        scores = packed_state.scores
+        free_cells = packed_state.get_free_cells()
+        if not free_cells:
+            return get_result(scores[player], scores[1 - player])
+
+        hand = packed_state.hands[player]
+        if len(free_cells) == 1:
+            # The last card decides the game, so only the best flip matters
+            cell = free_cells[0]
+            flip_gain = max(popcount(packed_state.placement_flips(cell, card_id, player)) for card_id in set(hand))
+            return get_result(scores[player] + flip_gain, scores[1 - player] - flip_gain)
+
+        key = packed_state.get_key(player)
+        entry = self.transposition_table.probe(key)
+        best_move = None
+        if entry is not None:
+            best_move = entry.best_move
+            if entry.bound == EXACT:
+                return entry.value
+            if entry.bound == LOWER_BOUND:
+                alpha = max(alpha, entry.value)
+            else:
+                beta = min(beta, entry.value)
+            if alpha >= beta:
+                return entry.value
+        original_alpha = alpha
+
+        # Try the stored best move, then moves that flip the most cards
+        actions = []
+        searched_card_ids = set()
+        for card_index, card_id in enumerate(hand):
+            if card_id in searched_card_ids:
+                self.duplicate_actions_pruned += len(free_cells)
+                continue
+            searched_card_ids.add(card_id)
+            for cell in free_cells:
+                flipped = packed_state.placement_flips(cell, card_id, player)
+                priority = float('inf') if (card_id, cell) == best_move else popcount(flipped)
+                actions.append((priority, card_index, cell, flipped))
+        actions.sort(key=lambda action: action[0], reverse=True)
+
+        value = LOSS - 1
+        for _, card_index, cell, flipped in actions:
+            card_id = hand[card_index]
+            token = packed_state.apply_move(player, card_index, cell, flipped)
+            result = -self._solve(packed_state, 1 - player, -beta, -alpha)
+            packed_state.undo_move(token)
+
+            if result > value:
+                value = result
+                best_move = card_id, cell
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        if value <= original_alpha:
+            bound = UPPER_BOUND
+        elif value >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        # Every solve reaches the end of the game, so the depth is the number of free cells
+        self.transposition_table.store(key, value, len(free_cells), bound, best_move)
+
+        return value
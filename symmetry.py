@@ -0,0 +1,133 @@
+from components import Card
+from packed import EMPTY, RANKS, PackedState
+from topology import SYMMETRY_TRANSFORMS, get_topology
+
+
+# Oriented card codes indexed [transform index][card id]: the card's element and its ranks in the
+# directions they face once the board is transformed, so cards that look alike after a turn share a code
+_oriented_codes = [[] for _ in SYMMETRY_TRANSFORMS]
+
+
+def _register_oriented_codes():
+    # Codes are built for every card the packed tables know about, in card id order
+    for card_id in range(len(_oriented_codes[0]), len(RANKS) // 4):
+        element_value = Card.get_by_id(card_id).element.value
+        for codes, (_, direction_map, _) in zip(_oriented_codes, SYMMETRY_TRANSFORMS):
+            ranks = [0] * 4
+            for direction in range(4):
+                ranks[direction_map[direction]] = RANKS[card_id * 4 + direction]
+            code = element_value
+            for rank in ranks:
+                code = code * 16 + rank
+            codes.append(code)
+
+
+def get_canonical_key(game_state, agent_index=None):
+    """Returns a key shared by a GameState and its rotations and reflections, with a given player to move"""
+    if agent_index is None:
+        agent_index = game_state.get_current_player().index
+    packed_state = PackedState.from_game_state(game_state)
+    return BoardSymmetry(packed_state).get_canonical_key(packed_state, agent_index)
+
+
+class BoardSymmetry:
+
+    """ Class to recognize positions of a packed state that are rotations or reflections of one another.
+
+    Turning the board turns every card with it, on the board and in hand, so each card's
+    ranks face new directions. A turned position has the same value as the original, and
+    two positions are equivalent when one matches a turned copy of the other by ranks,
+    element and owner in every space and hand. Only the turns of the board shape that
+    keep every elemental space on a space of the same element are used, so an asymmetric
+    element layout leaves just the identity.
+
+    Moves only take cards from hand to board and change owners, so a position can only
+    be equivalent to another position of the same game under a symmetry that turns the
+    game's cards, taken together, into the same cards. Searches pass within_game to keep
+    just those symmetries, which for most deals leaves the identity and no extra cost.
+
+    Attributes:
+        symmetries (Tuple): (index into SYMMETRY_TRANSFORMS, cell map) for each symmetry of the board, identity first
+        within_game (bool): Whether only the symmetries preserving the cards in play are kept
+
+    Methods:
+        is_symmetric: Returns true if the board has a symmetry besides the identity
+        get_canonical_key: Returns a key shared by a position and its turned copies, with a given player to move
+        get_stabilizer: Returns the symmetries that map a position onto itself
+        get_distinct_actions: Returns one action for each set of actions leading to equivalent positions,
+            and the number of actions left out
+    """
+
+    def __init__(self, packed_state, within_game=False):
+        topology = get_topology(packed_state.width, packed_state.height, packed_state.rules.is_same_wall)
+        elements = packed_state.cell_elements
+        rules = packed_state.rules
+        # Keys of positions under other rules or element layouts never match
+        self._layout_key = (rules.is_elemental, rules.is_same, rules.is_same_wall, rules.is_plus,
+                            packed_state.width, packed_state.height, tuple(element.value for element in elements))
+        self.symmetries = tuple(
+            (index, cell_map) for index, cell_map in topology.symmetries
+            if all(elements[cell_map[cell]] is elements[cell] for cell in range(topology.cell_count))
+        )
+
+        self.within_game = within_game
+        if within_game:
+            if len(_oriented_codes[0]) < len(RANKS) // 4:
+                _register_oriented_codes()
+            card_ids = [card_id for card_id in packed_state.cells if card_id != EMPTY]
+            card_ids.extend(card_id for hand in packed_state.hands for card_id in hand)
+            identity_codes = sorted(_oriented_codes[0][card_id] for card_id in card_ids)
+            self.symmetries = tuple(
+                (index, cell_map) for index, cell_map in self.symmetries
+                if sorted(_oriented_codes[index][card_id] for card_id in card_ids) == identity_codes
+            )
+
+    def is_symmetric(self):
+        return len(self.symmetries) > 1
+
+    def _get_signature(self, packed_state, index, cell_map):
+        if len(_oriented_codes[index]) < len(RANKS) // 4:
+            _register_oriented_codes()
+        codes = _oriented_codes[index]
+        cells = packed_state.cells
+        owners = packed_state.owners
+
+        board = [EMPTY] * packed_state.cell_count
+        occupied = packed_state.occupied
+        while occupied:
+            lowest_bit = occupied & -occupied
+            cell = lowest_bit.bit_length() - 1
+            board[cell_map[cell]] = codes[cells[cell]] * 2 + (owners >> cell & 1)
+            occupied ^= lowest_bit
+        return (tuple(board),) + tuple(tuple(sorted(codes[card_id] for card_id in hand))
+                                       for hand in packed_state.hands)
+
+    def get_canonical_key(self, packed_state, player):
+        signature = min(self._get_signature(packed_state, index, cell_map) for index, cell_map in self.symmetries)
+        return hash((self._layout_key, player, signature))
+
+    def get_stabilizer(self, packed_state):
+        index, cell_map = self.symmetries[0]
+        signature = self._get_signature(packed_state, index, cell_map)
+        return [(index, cell_map) for index, cell_map in self.symmetries
+                if self._get_signature(packed_state, index, cell_map) == signature]
+
+    def get_distinct_actions(self, packed_state, player, actions):
+        """ Actions are tuples starting with (card_index, cell). A symmetry mapping the position onto itself
+            maps each action onto an equivalent one, and cards that look alike are interchangeable,
+            so the first action of each such set is kept.
+        """
+        stabilizer = self.get_stabilizer(packed_state) if self.is_symmetric() else self.symmetries
+        if len(_oriented_codes[0]) < len(RANKS) // 4:
+            _register_oriented_codes()
+        hand = packed_state.hands[player]
+
+        seen = set()
+        distinct_actions = []
+        for action in actions:
+            card_id, cell = hand[action[0]], action[1]
+            orbit_key = min((_oriented_codes[index][card_id], cell_map[cell]) for index, cell_map in stabilizer)
+            if orbit_key not in seen:
+                seen.add(orbit_key)
+                distinct_actions.append(action)
+        return distinct_actions, len(actions) - len(distinct_actions)
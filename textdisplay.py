@@ -1,5 +1,6 @@
 import colorama  # Fore, Back, Style
 from components import Direction, Element
+from events import ComboEvent, PlusEvent, SameEvent, SuddenDeathEvent, ThinkingEvent
 
 
 class TripleTriadColors:
@@ -12,12 +13,33 @@ class TripleTriadColors:
     COLOR_POSITIVE = colorama.Fore.GREEN
 
 
+class NullGraphics:
+
+    """Display that draws nothing, for headless games and simulations"""
+
+    def subscribe(self, events):
+        pass
+
+    def display_game_state(self, state):
+        pass
+
+    def display_end_game(self, state):
+        pass
+
+
 class TripleTriadGraphics:
 
     def __init__(self):
         colorama.init()
         self.colors = TripleTriadColors
 
+    def subscribe(self, events):
+        events.subscribe(SameEvent, lambda event: print("SAME!"))
+        events.subscribe(PlusEvent, lambda event: print("PLUS!"))
+        events.subscribe(ComboEvent, lambda event: print("COMBO!"))
+        events.subscribe(SuddenDeathEvent, lambda event: print("SUDDEN DEATH IN PLAY"))
+        events.subscribe(ThinkingEvent, lambda event: print("Thinking..."))
+
     def display_game_state(self, state):
         non_turn_agent = [agent for agent in state.get_agents() if not agent.index == state.get_current_player().index]
         non_turn_agent = non_turn_agent[0]
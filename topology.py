@@ -0,0 +1,129 @@
+from array import array
+from components import Direction
+
+
+# Directions are packed as indexes; the opposite direction of d is d ^ 2
+TOP, RIGHT, BOTTOM, LEFT = range(4)
+DIRECTIONS = (Direction.TOP, Direction.RIGHT, Direction.BOTTOM, Direction.LEFT)
+OPPOSITE_DIRECTIONS = {direction: direction.get_opposite() for direction in Direction}
+
+# Neighbor table entries that are not grid spaces
+NO_NEIGHBOR = -1
+WALL = -2
+
+# The rotations and reflections of a board, as (maps (x, y) to new coordinates given width and height,
+# maps each direction index to the direction it faces afterwards, keeps the board shape only when square)
+SYMMETRY_TRANSFORMS = (
+    (lambda x, y, w, h: (x, y), (TOP, RIGHT, BOTTOM, LEFT), False),
+    (lambda x, y, w, h: (h - 1 - y, x), (RIGHT, BOTTOM, LEFT, TOP), True),
+    (lambda x, y, w, h: (w - 1 - x, h - 1 - y), (BOTTOM, LEFT, TOP, RIGHT), False),
+    (lambda x, y, w, h: (y, w - 1 - x), (LEFT, TOP, RIGHT, BOTTOM), True),
+    (lambda x, y, w, h: (w - 1 - x, y), (TOP, LEFT, BOTTOM, RIGHT), False),
+    (lambda x, y, w, h: (x, h - 1 - y), (BOTTOM, RIGHT, TOP, LEFT), False),
+    (lambda x, y, w, h: (y, x), (LEFT, BOTTOM, RIGHT, TOP), True),
+    (lambda x, y, w, h: (h - 1 - y, w - 1 - x), (RIGHT, TOP, LEFT, BOTTOM), True),
+)
+
+# The order GameBoardLocation neighbors are linked and resolved in
+_LINK_ORDER = ((Direction.LEFT, -1, 0), (Direction.RIGHT, 1, 0), (Direction.TOP, 0, -1), (Direction.BOTTOM, 0, 1))
+
+_topologies = {}
+
+
+class Topology:
+
+    """ Class to hold the neighbor tables of one board shape. Cells are numbered y * width + x.
+
+    Tables are built once per (width, height, same wall) by get_topology and shared by
+    every Grid and PackedState of that shape, so a board costs nothing to lay out.
+
+    Attributes:
+        width (int): The width of the board
+        height (int): The height of the board
+        cell_count (int): The number of spaces on the board
+        use_same_wall (bool): Whether board edges are walls
+        neighbors (array): Entry cell * 4 + direction index is the neighboring cell,
+            WALL for an edge under Same Wall or NO_NEIGHBOR
+        adjacency (Tuple): For each cell, a tuple of (direction index, neighbor cell) for the spaces next to it
+        sides (Tuple): For each cell, a tuple of (direction index, neighbor cell or WALL) for the spaces and walls
+            next to it
+        neighbor_cells (Tuple): For each cell, a tuple of (Direction, neighbor cell or WALL) in link order
+        neighbor_coordinates (Tuple[dict]): For each cell, Direction to neighbor coordinates, walls included
+        space_bits (Tuple): (cell bit, coordinates) for every space, column by column
+        symmetries (Tuple): (index into SYMMETRY_TRANSFORMS, cell map) for every rotation and reflection that
+            maps the board onto itself, identity first; cell map[cell] is the cell it moves to
+
+    Methods:
+        get_cell: Returns the cell index for grid coordinates
+        get_coordinates: Returns the grid coordinates for a cell index
+    """
+
+    def __init__(self, width, height, use_same_wall):
+        self.width = width
+        self.height = height
+        self.cell_count = width * height
+        self.use_same_wall = use_same_wall
+
+        edge = WALL if use_same_wall else NO_NEIGHBOR
+        self.neighbors = array('b')
+        for y in range(height):
+            for x in range(width):
+                self.neighbors.append((y - 1) * width + x if y > 0 else edge)
+                self.neighbors.append(y * width + x + 1 if x < width - 1 else edge)
+                self.neighbors.append((y + 1) * width + x if y < height - 1 else edge)
+                self.neighbors.append(y * width + x - 1 if x > 0 else edge)
+
+        self.adjacency = tuple(
+            tuple((direction, self.neighbors[cell * 4 + direction]) for direction in range(4)
+                  if self.neighbors[cell * 4 + direction] >= 0)
+            for cell in range(self.cell_count))
+        self.sides = tuple(
+            tuple((direction, self.neighbors[cell * 4 + direction]) for direction in range(4)
+                  if self.neighbors[cell * 4 + direction] != NO_NEIGHBOR)
+            for cell in range(self.cell_count))
+
+        neighbor_cells = []
+        neighbor_coordinates = []
+        for cell in range(self.cell_count):
+            x, y = self.get_coordinates(cell)
+            cells = []
+            coordinates = {}
+            for direction, dx, dy in _LINK_ORDER:
+                if 0 <= x + dx < width and 0 <= y + dy < height:
+                    cells.append((direction, self.get_cell((x + dx, y + dy))))
+                elif use_same_wall:
+                    cells.append((direction, WALL))
+                else:
+                    continue
+                coordinates[direction] = (x + dx, y + dy)
+            neighbor_cells.append(tuple(cells))
+            neighbor_coordinates.append(coordinates)
+        self.neighbor_cells = tuple(neighbor_cells)
+        self.neighbor_coordinates = tuple(neighbor_coordinates)
+
+        self.space_bits = tuple((1 << self.get_cell((x, y)), (x, y)) for x in range(width) for y in range(height))
+
+        # Same Wall puts walls on every edge, and edges move with the board, so walls never break a symmetry
+        symmetries = []
+        for index, (transform, _, needs_square) in enumerate(SYMMETRY_TRANSFORMS):
+            if not needs_square or width == height:
+                symmetries.append((index, tuple(self.get_cell(transform(x, y, width, height))
+                                                for x, y in map(self.get_coordinates, range(self.cell_count)))))
+        self.symmetries = tuple(symmetries)
+
+    def get_cell(self, coordinates):
+        x, y = coordinates
+        return y * self.width + x
+
+    def get_coordinates(self, cell):
+        return cell % self.width, cell // self.width
+
+
+def get_topology(width, height, use_same_wall):
+    """Returns the shared Topology for a board shape, building it on first use"""
+    key = (width, height, use_same_wall)
+    topology = _topologies.get(key)
+    if topology is None:
+        topology = Topology(width, height, use_same_wall)
+        _topologies[key] = topology
+    return topology
@@ -0,0 +1,223 @@
+from collections import OrderedDict
+
+# Bound types of stored values
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Replacement policies for an occupied slot
+REPLACE_ALWAYS = 'always'
+REPLACE_DEPTH = 'depth'
+
+
+class TranspositionEntry:
+
+    """Class to hold a stored search result
+
+    Attributes:
+        key (int): The full Zobrist key of the position
+        value (int): The searched value for the player to move
+        depth (int): The depth the position was searched to
+        bound (int): Whether the value is EXACT, a LOWER_BOUND or an UPPER_BOUND
+        best_move (Tuple(int)): The best (card id, cell) found, or None
+    """
+
+    __slots__ = ('key', 'value', 'depth', 'bound', 'best_move')
+
+    def __init__(self, key, value, depth, bound, best_move):
+        self.key = key
+        self.value = value
+        self.depth = depth
+        self.bound = bound
+        self.best_move = best_move
+
+
+class AgedTranspositionEntry(TranspositionEntry):
+
+    """Class to hold a stored search result along with the search that stored it
+
+    Attributes:
+        generation (int): The LRUTranspositionTable generation the entry was stored in
+    """
+
+    __slots__ = ('generation',)
+
+    def __init__(self, key, value, depth, bound, best_move, generation):
+        super().__init__(key, value, depth, bound, best_move)
+        self.generation = generation
+
+
+class TranspositionTable:
+
+    """ Class to cache search results in a fixed number of slots indexed by Zobrist key
+
+    Attributes:
+        size (int): The number of slots in the table
+        replacement (str or callable): REPLACE_DEPTH keeps the deeper of two results for a slot,
+            REPLACE_ALWAYS keeps the newest; a callable taking (stored entry, new depth)
+            and returning true to replace may be given instead
+
+    Methods:
+        probe: Returns the stored entry for a key, or None
+        store: Stores a search result, subject to the replacement policy
+        clear: Empties the table and resets the counters
+        get_stats: Returns a dict of hit, miss, collision, store and eviction counters
+    """
+
+    def __init__(self, size=1 << 16, replacement=REPLACE_DEPTH):
+        if replacement == REPLACE_ALWAYS:
+            replacement = TranspositionTable._replace_always
+        elif replacement == REPLACE_DEPTH:
+            replacement = TranspositionTable._replace_shallower
+        elif not callable(replacement):
+            raise ValueError('Unknown replacement policy: ' + str(replacement))
+
+        self.size = size
+        self._should_replace = replacement
+        self._slots = [None] * size
+
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return self.size - self._slots.count(None)
+
+    @staticmethod
+    def _replace_always(entry, depth):
+        return True
+
+    @staticmethod
+    def _replace_shallower(entry, depth):
+        return depth >= entry.depth
+
+    def probe(self, key):
+        entry = self._slots[key % self.size]
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.key != key:
+            # Another position shares the slot
+            self.collisions += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def store(self, key, value, depth, bound, best_move):
+        index = key % self.size
+        entry = self._slots[index]
+        if entry is not None:
+            if entry.key != key:
+                if not self._should_replace(entry, depth):
+                    return
+                self.evictions += 1
+            elif depth < entry.depth:
+                # Keep the deeper result for the same position
+                return
+
+        self._slots[index] = TranspositionEntry(key, value, depth, bound, best_move)
+        self.stores += 1
+
+    def clear(self):
+        self._slots = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def get_stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'evictions': self.evictions,
+        }
+
+
+class LRUTranspositionTable:
+
+    """ Class to cache search results by Zobrist key across searches, holding at most capacity entries
+        and evicting the least recently used entry to make room
+
+    Unlike TranspositionTable, every key gets its own entry, so results are only lost
+    to eviction. Each search starts a new generation, and hits on entries stored by
+    an earlier search are counted as reused.
+
+    Attributes:
+        capacity (int): The most entries the table holds
+        generation (int): The number of searches started so far
+
+    Methods:
+        probe: Returns the stored entry for a key, or None, marking it as recently used
+        store: Stores a search result, keeping the deeper result for a key already stored
+        new_search: Starts a new generation, keeping the stored entries
+        clear: Empties the table and resets the counters
+        get_stats: Returns a dict of hit, miss, reuse, store, eviction and size counters
+    """
+
+    def __init__(self, capacity=1 << 18):
+        self.capacity = capacity
+        self.generation = 0
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.reused = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def probe(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if entry.generation != self.generation:
+            self.reused += 1
+        return entry
+
+    def store(self, key, value, depth, bound, best_move):
+        entry = self._entries.get(key)
+        if entry is not None:
+            if depth < entry.depth:
+                # Keep the deeper result for the same position
+                self._entries.move_to_end(key)
+                return
+        elif len(self._entries) >= self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+        self._entries[key] = AgedTranspositionEntry(key, value, depth, bound, best_move, self.generation)
+        self._entries.move_to_end(key)
+        self.stores += 1
+
+    def new_search(self):
+        self.generation += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.reused = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def get_stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'reused': self.reused,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+        }
@@ -1,7 +1,11 @@
 from agents import KeyBoardAgent, MinMaxAgent
+from events import ComboEvent, FlipEvent, PlusEvent, SameEvent
 from game import Game
 from textdisplay import TripleTriadGraphics
+from topology import OPPOSITE_DIRECTIONS
+import constants
 
+from collections import deque
 import sys
 
 
@@ -19,9 +23,18 @@ class Rules:
     Methods:
         handle_card_placement: handles what happens after a card is placed on the board
             using whatever rules are present in a given game and increments Agent scores.
-            Currently, only Elemental rule has been implemented
-        _handle_combo:
-        _handle_score_change:
+            Returns the ownership changes made as a list of (GameBoardLocation, previous owner)
+            and publishes rule and flip events when given an EventBus. Set at construction to
+            the resolver for the active rules
+        _resolve_basic: Resolves a placement with only the basic rule
+        _resolve_elemental: Resolves a placement with the basic and elemental rules
+        _resolve_captures: Resolves a placement with Same and/or Plus, then the basic and elemental rules
+        _capture_same: Flips neighbors matching the challenger's adjoining ranks, then cascades Combo from them
+        _capture_plus: Flips neighbors sharing a sum with the challenger's adjoining ranks, then cascades Combo
+        _publish_flips: Publishes an event for each ownership change
+        _handle_combo: Flips opposing neighbors of flipped cards with smaller adjoining ranks, cascading
+            through each card it flips
+        _handle_ownership_change: Changes the owner of a space, records the flip and updates Agent scores
     """
 
     def __init__(self,
@@ -44,10 +57,36 @@ class Rules:
         # End of game rules
         self._is_sudden_death = use_sudden_death
 
+        # Pick the placement resolver once, so placements don't re-check which rules are active
+        self._captures = []
+        if self._is_same:
+            self._captures.append(Rules._capture_same)
+        if self._is_plus:
+            self._captures.append(Rules._capture_plus)
+
+        if self._captures:
+            self.handle_card_placement = self._resolve_captures
+        elif self._is_elemental:
+            self.handle_card_placement = self._resolve_elemental
+        else:
+            self.handle_card_placement = self._resolve_basic
+
     @property
     def is_elemental(self):
         return self._is_elemental
 
+    @property
+    def is_same(self):
+        return self._is_same
+
+    @property
+    def is_plus(self):
+        return self._is_plus
+
+    @property
+    def is_combo(self):
+        return self._is_combo
+
     @property
     def is_same_wall(self):
         return self._is_same_wall
@@ -56,94 +95,150 @@ class Rules:
     def is_sudden_death(self):
         return self._is_sudden_death
 
-    def handle_card_placement(self, challenger):
+    def _resolve_basic(self, challenger, events=None):
+        # Without Same Wall there are no walls, and every neighbor with an owner holds a card
+        flips = []
+        challenger_owner_index = challenger.owner.index
+        card = challenger.placed_card
+        for direction, neighbor in challenger.neighbors.items():
+            neighbor_owner = neighbor.owner
+            if neighbor_owner is not None and neighbor_owner.index != challenger_owner_index and \
+                    card.get_rank(direction) > neighbor.placed_card.get_rank(OPPOSITE_DIRECTIONS[direction]):
+                Rules._handle_ownership_change(challenger, neighbor, flips)
+
+        if events is not None:
+            Rules._publish_flips(challenger, flips, events)
+        return flips
+
+    def _resolve_elemental(self, challenger, events=None):
+        flips = []
+        challenger_owner_index = challenger.owner.index
+        card = challenger.placed_card
+        modifier = challenger.elemental_modifiers[card.element]
+        for direction, neighbor in challenger.neighbors.items():
+            neighbor_owner = neighbor.owner
+            if neighbor_owner is not None and neighbor_owner.index != challenger_owner_index:
+                neighbor_card = neighbor.placed_card
+                neighbor_rank = neighbor_card.get_rank(OPPOSITE_DIRECTIONS[direction]) + \
+                    neighbor.elemental_modifiers[neighbor_card.element]
+                if card.get_rank(direction) + modifier > neighbor_rank:
+                    Rules._handle_ownership_change(challenger, neighbor, flips)
+
+        if events is not None:
+            Rules._publish_flips(challenger, flips, events)
+        return flips
+
+    def _resolve_captures(self, challenger, events=None):
         # The challenger contains references to the neighbor spaces/cards
+        flips = []
 
         count_opposing_player_spaces = 0
-        neighbors_with_cards = {}
+        neighbors_with_cards = []
         for direction, neighbor in challenger.neighbors.items():
             if neighbor.has_card:
-                neighbors_with_cards[direction] = neighbor
+                neighbors_with_cards.append((direction, neighbor))
                 if neighbor.owner and neighbor.owner.index != challenger.owner.index:
                     count_opposing_player_spaces += 1
 
-        if self._is_same:
-            if count_opposing_player_spaces > 0 and len(neighbors_with_cards) > 1:
-                # Same Wall neighbors will be included if added to rules already
-                same_neighbors = {
-                    direction: neighbor
-                    for direction, neighbor in neighbors_with_cards.items()
-                    if challenger.is_equal(neighbor, direction)
-                }
-                if len(same_neighbors) >= 2:
-                    # They will be flipped
-                    # TODO display should be notified of SAME success
-                    print("SAME!")
-                    combo_occurred = False
-                    for direction, neighbor in same_neighbors.items():
-                        Rules._handle_ownership_change(challenger, neighbor)
-
-                        if self._is_combo:
-                            combo_result = self._handle_combo(challenger, neighbor.get_combo_neighbors().values())
-                            combo_occurred = combo_occurred or combo_result
-
-                    if combo_occurred:
-                        # TODO display should be notified of COMBO success
-                        print("COMBO!")
-
-        if self._is_plus:
-            combo_occurred = False
-            if count_opposing_player_spaces > 0:
-                plus_neighbors = {}
-                for direction, neighbor in neighbors_with_cards.items():
-                    # Don't grab the wall entities
-                    if neighbor.owner:
-                        plus_value = challenger.get_sum(neighbor, direction)
-                        if str(plus_value) in plus_neighbors:
-                            plus_neighbors[str(plus_value)][direction] = neighbor
-                        else:
-                            plus_neighbors[str(plus_value)] = {direction: neighbor}
-
-                # Only care about sums with more than one neighbor
-                for affected_neighbors in plus_neighbors.values():
-                    if len(affected_neighbors) >= 2:
-                        # They will be flipped
-                        # TODO display should be notified of PLUS success
-                        print("PLUS!")
-
-                        # These neighbors share a sum with the challenger, so flip them
-                        for affected_neighbor in affected_neighbors.values():
-                            Rules._handle_ownership_change(challenger, affected_neighbor)
-
-                            if self._is_combo:
-                                neighbors_neighbors = affected_neighbor.get_combo_neighbors().values()
-                                combo_result = self._handle_combo(challenger, neighbors_neighbors)
-                                combo_occurred = combo_occurred or combo_result
-
-                if combo_occurred:
-                    # TODO display should be notified of COMBO success
-                    print("COMBO!")
+        # Same and Plus only flip cards when an opposing card is adjacent
+        if count_opposing_player_spaces > 0:
+            for capture in self._captures:
+                capture(challenger, neighbors_with_cards, flips, events)
 
         # Standard flip rules
-        for direction, neighbor in neighbors_with_cards.items():
+        for direction, neighbor in neighbors_with_cards:
             if neighbor.owner and neighbor.owner.index != challenger.owner.index:
                 # GameBoardLocation checks if element rule in play
                 if challenger.can_flip(neighbor, direction):
-                    Rules._handle_ownership_change(challenger, neighbor)
+                    Rules._handle_ownership_change(challenger, neighbor, flips)
+
+        if events is not None:
+            Rules._publish_flips(challenger, flips, events)
+        return flips
+
+    @staticmethod
+    def _capture_same(challenger, neighbors_with_cards, flips, events):
+        if len(neighbors_with_cards) < 2:
+            return
+
+        # Same Wall neighbors will be included if added to rules already
+        same_neighbors = [neighbor for direction, neighbor in neighbors_with_cards
+                          if challenger.is_equal(neighbor, direction)]
+        if len(same_neighbors) >= 2:
+            # They will be flipped
+            if events is not None and events.wants(SameEvent):
+                events.publish(SameEvent(challenger.get_coordinates()))
+            # Walls count toward Same but are never flipped
+            same_neighbors = [neighbor for neighbor in same_neighbors if neighbor.owner is not None]
+            for neighbor in same_neighbors:
+                Rules._handle_ownership_change(challenger, neighbor, flips)
+
+            combo_occurred = Rules._handle_combo(challenger, same_neighbors, flips)
+            if combo_occurred and events is not None and events.wants(ComboEvent):
+                events.publish(ComboEvent(challenger.get_coordinates()))
 
     @staticmethod
-    def _handle_combo(challenger, affected_neighbors):
-        # Flip all neighbors of the flipped neighbor with smaller ranks on directional sides
+    def _capture_plus(challenger, neighbors_with_cards, flips, events):
+        plus_neighbors = {}
+        for direction, neighbor in neighbors_with_cards:
+            # Don't grab the wall entities
+            if neighbor.owner:
+                plus_value = challenger.get_sum(neighbor, direction)
+                if plus_value in plus_neighbors:
+                    plus_neighbors[plus_value].append(neighbor)
+                else:
+                    plus_neighbors[plus_value] = [neighbor]
+
+        # Only care about sums with more than one neighbor
+        combo_sources = []
+        for affected_neighbors in plus_neighbors.values():
+            if len(affected_neighbors) >= 2:
+                # They will be flipped
+                if events is not None and events.wants(PlusEvent):
+                    events.publish(PlusEvent(challenger.get_coordinates()))
+
+                # These neighbors share a sum with the challenger, so flip them
+                for affected_neighbor in affected_neighbors:
+                    Rules._handle_ownership_change(challenger, affected_neighbor, flips)
+                combo_sources.extend(affected_neighbors)
+
+        combo_occurred = Rules._handle_combo(challenger, combo_sources, flips)
+        if combo_occurred and events is not None and events.wants(ComboEvent):
+            events.publish(ComboEvent(challenger.get_coordinates()))
+
+    @staticmethod
+    def _publish_flips(challenger, flips, events):
+        if events.wants(FlipEvent):
+            for neighbor, previous_owner in flips:
+                events.publish(FlipEvent(neighbor.get_coordinates(), previous_owner, challenger.owner))
+
+    @staticmethod
+    def _handle_combo(challenger, sources, flips):
+        # Breadth first from the cards Same or Plus flipped: each opposing neighbor with a smaller
+        # adjoining rank is flipped and becomes a source itself. Each space is expanded at most once.
+        challenger_owner_index = challenger.owner.index
+        worklist = deque(sources)
+        visited = 0
         combo_occurred = False
-        for neighbors_neighbor in affected_neighbors:
-            if neighbors_neighbor.owner and neighbors_neighbor.owner.index != challenger.owner.index:
-                combo_occurred = True
-                Rules._handle_ownership_change(challenger, neighbors_neighbor)
+        while worklist:
+            source = worklist.popleft()
+            if visited & source.bit:
+                continue
+            visited |= source.bit
+
+            for direction, neighbor in source.neighbors.items():
+                neighbor_owner = neighbor.owner
+                if neighbor_owner is not None and neighbor_owner.index != challenger_owner_index and \
+                        source.is_greater(neighbor, direction):
+                    combo_occurred = True
+                    Rules._handle_ownership_change(challenger, neighbor, flips)
+                    worklist.append(neighbor)
 
         return combo_occurred
 
     @staticmethod
-    def _handle_ownership_change(challenger, neighbor):
+    def _handle_ownership_change(challenger, neighbor, flips):
+        flips.append((neighbor, neighbor.owner))
         neighbor.owner.decrement_score()
         neighbor.set_owner(challenger.owner)
         challenger.owner.increment_score()
@@ -158,6 +253,12 @@ def read_command(argv):
               (2) python triple_triad.py --elemental
               OR  python triple_triad.py -e
                   - starts a game using the elemental rule
+              (3) python triple_triad.py --move-time-ms 500
+                  - the computer player takes at most about half a second per move
+              (4) python triple_triad.py --width 4 --height 4
+                  - plays on a 4x4 board with nine cards in each hand
+              (5) python triple_triad.py --ponder
+                  - the computer player thinks about its reply while you choose your move
   """
     parser = OptionParser(usage_str)
     parser.add_option('-e', '--elemental', dest='use_elemental_rule', action='store_true',
@@ -170,17 +271,37 @@ def read_command(argv):
                       help='the game will observe the plus rule')
     parser.add_option('-d', '--sudden-death', dest='use_sudden_death_rule', action='store_true',
                       help='the game will observe the sudden death rule')
+    parser.add_option('-t', '--move-time-ms', dest='move_time_ms', type='int', default=constants.DEFAULT_MOVE_TIME_MS,
+                      help='the computer player searches for at most this many milliseconds per move, defaults to ' +
+                           str(constants.DEFAULT_MOVE_TIME_MS))
+    parser.add_option('-j', '--search-workers', dest='search_workers', type='int',
+                      help='the computer player searches root moves in this many processes')
+    parser.add_option('--ponder', dest='ponder', action='store_true',
+                      help='the computer player searches its replies while you choose your move')
+    parser.add_option('--width', dest='width', type='int', default=constants.GAME_GRID_WIDTH,
+                      help='the number of spaces in each row of the board')
+    parser.add_option('--height', dest='height', type='int', default=constants.GAME_GRID_HEIGHT,
+                      help='the number of spaces in each column of the board')
 
     options, junk = parser.parse_args(argv)
     if len(junk) != 0:
         raise Exception('Command line input not understood: ' + str(junk))
 
+    if options.width < 1 or options.height < 1 or options.width * options.height > constants.MAXIMUM_GRID_SPACES:
+        raise Exception('Board size not understood: {}x{}, boards hold at most {} spaces'.format(
+            options.width, options.height, constants.MAXIMUM_GRID_SPACES))
+
     parsed_arguments = dict()
     parsed_arguments['use_elemental_rule'] = options.use_elemental_rule or False
     parsed_arguments['use_same_rule'] = options.use_same_rule or False
     parsed_arguments['use_same_wall_rule'] = options.use_same_wall_rule or False
     parsed_arguments['use_plus_rule'] = options.use_plus_rule or False
     parsed_arguments['use_sudden_death_rule'] = options.use_sudden_death_rule or False
+    parsed_arguments['move_time_ms'] = options.move_time_ms
+    parsed_arguments['search_workers'] = options.search_workers
+    parsed_arguments['ponder'] = options.ponder or False
+    parsed_arguments['width'] = options.width
+    parsed_arguments['height'] = options.height
 
     return parsed_arguments
 
@@ -194,7 +315,8 @@ if __name__ == '__main__':
     # agents = [KeyBoardAgent(agent_index) for agent_index in range(constants.NUMBER_OF_PLAYERS)]
     agents = [
         KeyBoardAgent(0),
-        MinMaxAgent(1)
+        MinMaxAgent(1, move_time_ms=arguments['move_time_ms'], workers=arguments['search_workers'],
+                    ponder=arguments['ponder'])
     ]
 
     # Set up display
@@ -208,7 +330,7 @@ if __name__ == '__main__':
                   use_sudden_death=arguments['use_sudden_death_rule'])
 
     # Set up the game
-    game = Game(agents, display, rules)
+    game = Game(agents, display, rules, arguments['width'], arguments['height'])
 
     # Start the game
     game.run()